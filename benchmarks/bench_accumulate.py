@@ -0,0 +1,68 @@
+"""
+.. module: bench_accumulate
+   :platform: Windows, Linux, OSX
+
+Benchmark for the frame averaging in :py:func:`uc480.acquire`: compares the float accumulation used previously with the preallocated integer accumulator of :py:func:`uc480.average_frames` on synthetic 8-bit frames and checks that both give identical results.
+
+Usage::
+
+    python benchmarks/bench_accumulate.py [N] [width] [height]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from drivers.uc480 import average_frames
+
+
+# averaging as previously done in uc480.acquire
+def average_frames_float(frames, N):
+    data = None
+    for frame in frames:
+        if data is None:
+            data = frame.astype(float)
+        else:
+            data = data + frame
+    return data / float(N)
+
+
+# yields N frames taken from a small pool of random frames
+def synthetic_frames(pool, N):
+    for i in range(N):
+        yield pool[i % len(pool)]
+
+
+def run(func, pool, N):
+    if tracemalloc is not None:
+        tracemalloc.start()
+    t0 = time.time()
+    result = func(synthetic_frames(pool, N), N)
+    dt = time.time() - t0
+    peak = 0
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, dt, peak
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1280
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 1024
+
+    pool = [np.random.randint(0, 256, size=(height, width)).astype(np.uint8) for i in range(8)]
+
+    ref, tref, mref = run(average_frames_float, pool, N)
+    new, tnew, mnew = run(average_frames, pool, N)
+
+    print("%d frames of %d x %d pixels" % (N, width, height))
+    print("float accumulator:   %8.3f s, %8.1f fps, peak memory %8.1f MB" % (tref, N / tref, mref / 1e6))
+    print("integer accumulator: %8.3f s, %8.1f fps, peak memory %8.1f MB" % (tnew, N / tnew, mnew / 1e6))
+    print("speedup: %.2f, identical results: %s" % (tref / tnew, np.array_equal(ref, new)))
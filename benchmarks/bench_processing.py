@@ -0,0 +1,65 @@
+"""
+.. module: bench_processing
+   :platform: Windows, Linux, OSX
+
+Microbenchmark for the per-spectrum processing (dark subtraction, clamping, OD and running average): compares the array expressions previously used in `pyUVVIS.OnUpdate` with :py:class:`uvvis.processing.ProcessingKernel` and the running statistics (:py:class:`uvvis.processing.RunningStatistics`, Welford's algorithm) that :py:class:`uvvis.acquisition.AcquisitionController` updates for every spectrum while recording.
+
+Usage::
+
+    python benchmarks/bench_processing.py [N] [pixels]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from uvvis.processing import ProcessingKernel, RunningStatistics
+
+
+# processing as previously done in pyUVVIS.OnUpdate
+def process_legacy(data, dark, reference, avg, cAvg):
+    data = data - dark
+    data = np.maximum(np.ones(len(data)), data)
+    data = np.nan_to_num(-np.log10(data / reference))
+    if avg is not None:
+        data = (float(cAvg) * avg + data) / float(cAvg + 1)
+    return data
+
+
+def run_legacy(spectra, dark, reference):
+    avg = None
+    for i, data in enumerate(spectra):
+        avg = process_legacy(data, dark, reference, avg, i)
+    return avg
+
+
+# processing as done by AcquisitionController.process and AcquisitionController.update while recording
+def run_kernel(spectra, dark, reference):
+    kernel = ProcessingKernel()
+    stats = RunningStatistics()
+    for data in spectra:
+        stats.add(kernel.process(data, dark, reference))
+    return stats.mean
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    npx = int(sys.argv[2]) if len(sys.argv) > 2 else 3648
+
+    dark = np.random.rand(npx) * 10
+    reference = np.random.rand(npx) * 1000 + 100
+    spectra = [np.random.rand(npx) * 500 for i in range(16)]
+    spectra = [spectra[i % len(spectra)] for i in range(N)]
+
+    t0 = time.time()
+    ref = run_legacy(spectra, dark, reference)
+    tref = time.time() - t0
+    t0 = time.time()
+    new = run_kernel(spectra, dark, reference)
+    tnew = time.time() - t0
+
+    print("%d spectra of %d pixels" % (N, npx))
+    print("legacy: %8.3f s, %8.1f us / spectrum" % (tref, tref / N * 1e6))
+    print("kernel: %8.3f s, %8.1f us / spectrum" % (tnew, tnew / N * 1e6))
+    print("speedup: %.2f, max. deviation: %g" % (tref / tnew, np.amax(np.abs(ref - new))))
@@ -0,0 +1,262 @@
+"""
+.. module: suite
+   :platform: Windows, Linux, OSX
+
+End-to-end benchmark suite against the simulated uc480 camera (:py:class:`drivers.uc480.simulated.SimulatedCamera`). Measures frames per second and per-frame latency of
+
+    - `acquire` / `acquireBinned` for different numbers of frames and image sizes,
+    - the per-spectrum processing (dark subtraction, clamping, OD, averaging),
+    - the complete acquisition loop from the backend to the result queue,
+    - decimation and drawing of the plot (drawing only if wx is available),
+    - saving and loading spectra and streaming time series to disk.
+
+The simulated camera replays a pool of pregenerated frames without real-time delays, so the results show the cost of the data path and not of the noise generation or the exposure. The results are written as JSON; with `--compare`, they are compared to a previous run and slowdowns beyond the threshold are reported.
+
+Usage::
+
+    python benchmarks/suite.py [--out results.json] [--compare baseline.json] [--threshold 1.2] [--quick] [--filter name]
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import platform
+import tempfile
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from drivers.uc480.simulated import SimulatedCamera
+import drivers.backends as backends
+from uvvis.processing import ProcessingKernel, RunningStatistics
+from uvvis.acquisition import AcquisitionController
+from uvvis.display import decimate
+from uvvis.recorder import SpectrumRecorder
+from uvvis import fileio
+
+clock = getattr(time, "perf_counter", time.time)
+
+
+def measure(func, repeat, warmup = 1, frames = 1):
+    """Call `func` `repeat` times and return the timing statistics.
+
+    :param func func: Function without arguments.
+    :param int repeat: Number of timed calls.
+    :param int warmup: Number of calls before timing starts.
+    :param int frames: Number of frames (spectra, ..) processed per call.
+    :returns: Dictionary with the total time, frames per second and latency per call in ms (mean, p50, p95, max).
+    """
+    for i in range(warmup):
+        func()
+    times = np.empty(repeat)
+    for i in range(repeat):
+        t0 = clock()
+        func()
+        times[i] = clock() - t0
+    total = float(np.sum(times))
+    ms = times * 1000.0
+    return {"calls": repeat, "frames": repeat * frames, "total_s": total,
+            "fps": repeat * frames / total if total > 0 else None,
+            "latency_ms": {"mean": float(np.mean(ms)), "p50": float(np.percentile(ms, 50)),
+                           "p95": float(np.percentile(ms, 95)), "max": float(np.amax(ms))}}
+
+
+def camera(width, height):
+    cam = SimulatedCamera(width, height, realtime=False, seed=0, pool=8)
+    cam.connect()
+    cam.set_exposure(10)
+    cam.acquire(cam.pool)    # fill the frame pool
+    return cam
+
+
+# ##########################################################################################################
+# benchmarks; each yields (name, parameters, result)
+def bench_acquire(quick):
+    sizes = [(1280, 1024), (1280, 64)] if quick else [(1280, 1024), (1280, 256), (1280, 64), (640, 480)]
+    for width, height in sizes:
+        cam = camera(width, height)
+        for N in ([1, 10] if quick else [1, 10, 100]):
+            repeat = max(3, 50 // N)
+            params = {"width": width, "height": height, "N": N}
+            yield "acquire", params, measure(lambda: cam.acquire(N), repeat, frames=N)
+            yield "acquireBinned", params, measure(lambda: cam.acquireBinned(N, ybin=False), repeat, frames=N)
+        cam.disconnect()
+
+
+def bench_processing(quick):
+    for npx in [1280, 3648]:
+        rng = np.random.RandomState(0)
+        spectra = [rng.rand(npx) * 500 for i in range(16)]
+        dark = rng.rand(npx) * 10
+        reference = rng.rand(npx) * 1000 + 100
+        kernel = ProcessingKernel()
+        stats = RunningStatistics()
+        state = {"i": 0}
+
+        def step(mode):
+            data = spectra[state["i"] % len(spectra)]
+            state["i"] += 1
+            if mode == "counts":
+                out = kernel.process(data, dark)
+            else:
+                out = kernel.process(data, dark, reference)
+            stats.add(out)
+
+        repeat = 2000 if quick else 20000
+        for mode in ["counts", "od"]:
+            stats.reset()
+            yield "processing", {"pixels": npx, "mode": mode}, measure(lambda: step(mode), repeat, warmup=10)
+
+
+def bench_pipeline(quick):
+    # spectra from the simulated backend through the acquisition controller into the result queue
+    cam = backends.SimulatedBackend()
+    cam.connect()
+    cam.cam.realtime = False
+    cam.cam.pool = 8
+    cam.set_exposure(10)
+    cam.cam.acquire(cam.cam.pool)
+
+    N = 200 if quick else 1000
+    acq = AcquisitionController(cam.read, maxsize=4)
+    acq.avg = N
+
+    def run():
+        acq.start(recording=True)
+        acq.wait()
+
+    yield "pipeline", {"pixels": cam.cam.get_image_size()[0], "N": N}, measure(run, 3, warmup=0, frames=N)
+    cam.close()
+
+
+def bench_plot(quick):
+    rng = np.random.RandomState(0)
+    for npx in [1280, 3648]:
+        x = np.linspace(400, 800, npx)
+        y = rng.rand(npx)
+        for width in [800, 1920]:
+            yield "decimate", {"pixels": npx, "width": width}, measure(lambda: decimate(x, y, width), 2000 if quick else 20000, warmup=10)
+
+    try:
+        import wx
+        import wx.lib.plot as plot
+    except ImportError:
+        yield "draw", {}, {"skipped": "wx not available"}
+        return
+
+    app = wx.App(False)
+    frame = wx.Frame(None, size=(1200, 800))
+    canvas = plot.PlotCanvas(frame)
+    frame.Show()
+    x = np.linspace(400, 800, 1280)
+    lines = [plot.PolyLine(decimate(x, rng.rand(1280), 1200), width=2, colour=wx.Colour(255, 0, 0)) for i in range(4)]
+
+    def draw():
+        canvas.Draw(plot.PlotGraphics(lines, '', 'Wavelength', 'Counts'))
+        app.Yield()
+
+    yield "draw", {"lines": len(lines), "pixels": 1280}, measure(draw, 50 if quick else 200)
+    frame.Destroy()
+
+
+def bench_fileio(quick):
+    tmp = tempfile.mkdtemp()
+    try:
+        rng = np.random.RandomState(0)
+        for npx in [1280, 3648]:
+            wl = np.linspace(400, 800, npx)
+            data = rng.rand(npx) * 1000
+            err = rng.rand(npx)
+            repeat = 50 if quick else 500
+            for fmt, ext in [("binary", fileio.EXTENSION), ("text", ".txt")]:
+                fn = os.path.join(tmp, "spectrum" + ext)
+                params = {"pixels": npx, "format": fmt}
+                yield "save", params, measure(lambda: fileio.save_spectrum(fn, wl, data, errors=err, exposure=10), repeat)
+                yield "load", params, measure(lambda: np.asarray(fileio.load_spectrum(fn)[1]).sum(), repeat)
+
+            # time series
+            N = 1000 if quick else 10000
+            fn = os.path.join(tmp, "series" + fileio.EXTENSION)
+
+            def record():
+                rec = SpectrumRecorder(fn, wl, maxqueue=N)
+                for i in range(N):
+                    rec.append(data)
+                rec.close()
+
+            yield "record", {"pixels": npx, "N": N}, measure(record, 3, warmup=0, frames=N)
+            yield "load_series", {"pixels": npx, "N": N, "mmap": True}, measure(lambda: fileio.load_binary(fn)[1][-1].sum(), 20)
+            yield "load_series", {"pixels": npx, "N": N, "mmap": False}, measure(lambda: fileio.load_binary(fn, mmap=False)[1][-1].sum(), 5)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+BENCHMARKS = [("acquire", bench_acquire), ("processing", bench_processing), ("pipeline", bench_pipeline),
+              ("plot", bench_plot), ("fileio", bench_fileio)]
+
+
+def environment():
+    """Returns a description of the machine and the software versions.
+    """
+    return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor()}
+
+
+def key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """Print the change of the mean latency with respect to a previous run.
+
+    :returns: Number of benchmarks that are slower than `threshold` x baseline.
+    """
+    old = dict((key(r), r) for r in baseline["results"] if "latency_ms" in r)
+    slower = 0
+    for r in results:
+        if "latency_ms" not in r or key(r) not in old:
+            continue
+        ratio = r["latency_ms"]["mean"] / old[key(r)]["latency_ms"]["mean"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            slower += 1
+        print("%-14s %-50s %6.2fx%s" % (r["name"], json.dumps(r["params"], sort_keys=True), ratio, flag))
+    return slower
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="pyUVVIS benchmark suite")
+    parser.add_argument("--out", default="benchmark.json", help="output file (default: benchmark.json)")
+    parser.add_argument("--compare", help="previous results to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown factor reported as regression (default: 1.2)")
+    parser.add_argument("--quick", action="store_true", help="fewer parameters and repetitions")
+    parser.add_argument("--filter", help="run only benchmarks whose group contains this string")
+    args = parser.parse_args(argv)
+
+    results = []
+    for group, bench in BENCHMARKS:
+        if args.filter and args.filter not in group:
+            continue
+        for name, params, result in bench(args.quick):
+            result.update({"group": group, "name": name, "params": params})
+            results.append(result)
+            if "skipped" in result:
+                print("%-14s %-50s skipped: %s" % (name, json.dumps(params, sort_keys=True), result["skipped"]))
+            else:
+                print("%-14s %-50s %10.1f fps %9.3f ms" % (name, json.dumps(params, sort_keys=True), result["fps"], result["latency_ms"]["mean"]))
+
+    with open(args.out, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
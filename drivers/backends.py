@@ -0,0 +1,492 @@
+"""
+.. module: drivers.backends
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Common interface for all input devices of pyUVVIS and registry of the available backends.
+
+Each backend wraps one type of device and is registered under a unique name with :py:func:`register_backend`. Backends provided by other packages are found through the `pyuvvis.backends` entry point group, e.g.::
+
+    entry_points={"pyuvvis.backends": ["mydevice = mypackage.mymodule:MyBackend"]}
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import os
+import numpy as np
+
+# capability flags
+CAP_EXPOSURE = "exposure"    # exposure time can be set
+CAP_GAIN = "gain"            # gain can be set
+CAP_ROI = "roi"              # readout can be restricted to the spectral region of the sensor
+CAP_TRIGGER = "trigger"      # spectra can be taken on an external trigger
+
+ENTRY_POINT_GROUP = "pyuvvis.backends"
+
+_backends = {}
+_entry_points_loaded = False
+
+
+def register_backend(cls):
+    """Register a backend class under its `name`. Can be used as class decorator.
+    """
+    _backends[cls.name] = cls
+    return cls
+
+
+# load backends registered by other packages
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    try:
+        from importlib.metadata import entry_points
+        eps = entry_points()
+        if hasattr(eps, "select"):
+            eps = eps.select(group=ENTRY_POINT_GROUP)
+        else:
+            eps = eps.get(ENTRY_POINT_GROUP, [])
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return
+        eps = pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+
+    for ep in eps:
+        try:
+            register_backend(ep.load())
+        except Exception as e:
+            print("WARNING: Could not load backend %s: %s" % (ep.name, e))
+
+
+def get_backends():
+    """Returns a dictionary of all registered backend classes by name.
+    """
+    _load_entry_points()
+    return dict(_backends)
+
+
+def get_backend(name):
+    """Returns the backend class registered under the given name.
+
+    :raises KeyError: if there is no such backend.
+    """
+    return get_backends()[name]
+
+
+def probe_backends():
+    """Returns the names of all backends with at least one connected device. The simulated device is not included.
+    """
+    return [name for name, cls in sorted(get_backends().items()) if not cls.simulated and cls.available()]
+
+
+# ##########################################################################################################
+# backend interface
+class Spectrometer(object):
+    """Base class for all input devices.
+
+    A backend reads spectra as 1d arrays (:py:func:`read`, :py:func:`acquire`) and exposes the device limits as attributes. Settings that are not supported (see :py:attr:`capabilities`) are silently ignored. If several devices of one type are connected, one backend instance is created per device with the identifiers returned by :py:func:`devices`.
+
+    :var str name: Unique name of the backend.
+    :var str label: Name of the device shown to the user.
+    :var set capabilities: Capability flags (CAP_*).
+    :var bool simulated: True if the backend does not need any hardware.
+    :var dtype: Native data type of the raw pixel values.
+    :var float satlevel: Pixel value at which the detector saturates.
+    :var int settle: Number of frames that may still be exposed with the old settings after a change, e.g. for free running cameras.
+    """
+    name = None
+    label = None
+    capabilities = frozenset()
+    simulated = False
+    dtype = np.float64
+    satlevel = 1.0
+    settle = 0
+
+    def __init__(self, device = None):
+        """Constructor.
+
+        :param device: Identifier of the device to connect to as returned by :py:func:`devices` or None for the first available device.
+        """
+        self.device = device
+
+    @classmethod
+    def available(cls):
+        """Returns True if at least one device of this type is connected.
+        """
+        return False
+
+    @classmethod
+    def devices(cls):
+        """Returns the identifiers of all connected devices of this type.
+        """
+        return [None] if cls.available() else []
+
+    def supports(self, capability):
+        """Returns True if the device supports the given capability flag.
+        """
+        return capability in self.capabilities
+
+    def connect(self):
+        """Connect to the first available device.
+        """
+        pass
+
+    def close(self):
+        """Close the connection to the device.
+        """
+        pass
+
+    def wavelengths(self):
+        """Returns the wavelength axis or None if the device is not calibrated.
+        """
+        return None
+
+    def pixels(self):
+        """Returns the number of points of the spectra.
+        """
+        wl = self.wavelengths()
+        if wl is not None:
+            return len(wl)
+        return len(self.read()[0])
+
+    def device_id(self):
+        """Returns a string that identifies the connected device, e.g. name and serial number.
+        """
+        return self.name
+
+    def dark_id(self):
+        """Returns a string that identifies the device together with its readout geometry, under which dark spectra are stored (see :py:class:`uvvis.dark.DarkLibrary`). Dark spectra only apply to spectra read with the same geometry, e.g. the same rows of a camera sensor.
+        """
+        return self.device_id()
+
+    def get_temperature(self):
+        """Returns the detector temperature in deg C or None if not available.
+        """
+        return None
+
+    def set_trigger(self, edge, delay = 0, timeout = 1000):
+        """Take the spectra on an external trigger.
+
+        :param str edge: "off" (free running), "rising" or "falling" edge of the TTL signal at the trigger input.
+        :param int delay: Delay between the trigger edge and the start of the exposure in us.
+        :param float timeout: Time in ms to wait for a trigger before reading a spectrum fails.
+        """
+        pass
+
+    def set_timer(self, timer):
+        """Record the stages of reading a spectrum (camera wait, conversion, ..) with the given :py:class:`uvvis.timing.StageTimer` (None = off). Backends without internal stages ignore this.
+        """
+        pass
+
+    def get_exposure(self):
+        """Returns the current exposure time in ms.
+        """
+        return 0
+
+    def set_exposure(self, exp):
+        """Set the exposure time in ms.
+        """
+        pass
+
+    def get_exposure_limits(self):
+        """Returns the supported limits for the exposure time (*min, max, increment*).
+        """
+        return 0, 100, 1
+
+    def get_gain(self):
+        """Returns the current gain setting.
+        """
+        return 0
+
+    def set_gain(self, gain):
+        """Set the gain.
+        """
+        pass
+
+    def get_gain_limits(self):
+        """Returns gain limits (*min, max, increment*).
+        """
+        return 0, 100, 1
+
+    def read(self):
+        """Read a single spectrum. Backends have to override either this function or :py:func:`read_peak`.
+
+        :returns: Spectrum as 1d array and a flag indicating whether the detector was saturated (data, ovexp).
+        """
+        data, peak = self.read_peak()
+        return data, peak >= self.satlevel
+
+    def read_peak(self):
+        """Read a single spectrum together with the highest raw pixel value, which is compared to :py:attr:`satlevel`, e.g. for auto exposure. Backends that sum several pixels into one spectral point have to override this.
+
+        :returns: Spectrum as 1d array and peak pixel value (data, peak).
+        """
+        data, _ = self.read()
+        return data, np.amax(data)
+
+    def read_mask(self):
+        """Read a single spectrum together with a mask of the saturated points, e.g. for HDR acquisition. Backends that sum several pixels into one spectral point have to override this.
+
+        :returns: Spectrum as 1d array and boolean array that is True for saturated points (data, saturated).
+        """
+        data, peak = self.read_peak()
+        return data, np.asarray(data) >= self.satlevel
+
+    def acquire(self, N = 1):
+        """Read N spectra and return their average. Backends should override this with the fastest native way of acquiring a batch of spectra.
+
+        :param int N: Number of spectra to average.
+        :returns: Averaged spectrum and a flag indicating whether the detector was saturated in any of the spectra (data, ovexp).
+        """
+        data, ovexp = self.read()
+        data = np.array(data, dtype=float)
+        for i in range(int(N) - 1):
+            d, o = self.read()
+            data += d
+            ovexp = ovexp or o
+        return data / float(N), ovexp
+
+
+# ##########################################################################################################
+# backends
+@register_backend
+class UC480Backend(Spectrometer):
+    """Thorlabs' uc480 compatible cameras. The spectrum is obtained by binning the frames over the vertical axis.
+
+    The wavelength axis is obtained from a linear fit to the pixel - wavelength pairs in *calibration.dat* in the working directory, if present.
+    """
+    name = "uc480"
+    label = "uc480"
+    capabilities = frozenset([CAP_EXPOSURE, CAP_GAIN, CAP_ROI, CAP_TRIGGER])
+    dtype = np.uint8
+    satlevel = 255
+    nbuffers = 64        # frames queued in the ring buffer of the camera when triggered
+
+    # returns a new, unconnected camera object
+    @staticmethod
+    def _camera():
+        import drivers.uc480 as cam
+        return cam.uc480()
+
+    @classmethod
+    def available(cls):
+        try:
+            cam480 = cls._camera()
+            cam480.connect()    # see whether we can connect
+            cam480.disconnect()
+        except Exception:
+            return False
+        return True
+
+    @classmethod
+    def devices(cls):
+        try:
+            return [deviceID for serial, cameraID, deviceID in cls._camera().cameras()]
+        except Exception:
+            return []
+
+    def connect(self):
+        self.cam = self._camera()
+        self.cam.connect(deviceID=self.device)
+        self.cam.load_profile()    # restrict readout to the spectral stripe if calibrated
+
+    def close(self):
+        self.cam.disconnect()
+
+    def wavelengths(self):
+        if not os.path.exists("calibration.dat"):
+            return None
+        px, wl = np.loadtxt("calibration.dat", unpack=True)
+        n = float(len(px))
+        b = (n * np.sum(px * wl) - np.sum(px) * np.sum(wl)) / (n * np.sum(px**2) - np.sum(px)**2)
+        a = np.mean(wl) - b * np.mean(px)
+        return a + np.arange(self.cam.get_image_size()[0]) * b
+
+    def pixels(self):
+        return self.cam.get_image_size()[0]
+
+    def device_id(self):
+        return "%s_%s" % (self.name, self.cam.get_serial())
+
+    # the spectrum is summed over the rows of the AOI or the software ROI, so darks depend on AOI, binning, subsampling and ROI
+    def dark_id(self):
+        x, y, width, height = self.cam.get_aoi()
+        key = "%s_aoi%d,%d,%dx%d_bin%dx%d_sub%dx%d" % ((self.device_id(), x, y, width, height) + tuple(self.cam.get_binning()) + tuple(self.cam.get_subsampling()))
+        y, height, hardware = self.cam.get_roi()
+        if not hardware:
+            key += "_rows%d+%d" % (y, height)
+        return key
+
+    def get_temperature(self):
+        return self.cam.get_temperature()
+
+    # triggered frames are captured continuously into the ring buffer, so that no trigger is lost between two reads
+    def set_trigger(self, edge, delay = 0, timeout = 1000):
+        self.cam.set_trigger(edge, delay, timeout)
+        if edge in ("rising", "falling"):
+            if not self.cam.is_capturing():
+                self.cam.start_capture(self.nbuffers)
+        elif self.cam.is_capturing():
+            self.cam.stop_capture()
+
+    # discard the frames queued in the ring buffer, which were exposed with the old settings
+    def _flush(self):
+        if self.cam.is_capturing():
+            self.cam.stop_capture()
+            self.cam.start_capture(self.nbuffers)
+
+    def set_timer(self, timer):
+        self.cam.timer = timer
+
+    def get_exposure(self):
+        return self.cam.get_exposure()
+
+    def set_exposure(self, exp):
+        self.cam.set_exposure(exp)
+        self._flush()
+
+    def get_exposure_limits(self):
+        return self.cam.get_exposure_limits()
+
+    def get_gain(self):
+        return self.cam.get_gain()
+
+    def set_gain(self, gain):
+        self.cam.set_gain(gain)
+        self._flush()
+
+    def get_gain_limits(self):
+        return self.cam.get_gain_limits()
+
+    def calibrate_roi(self):
+        """Locate the spectral stripe on the sensor and restrict the readout to it (see :py:func:`uc480.calibrate_roi`).
+
+        :returns: First row and number of rows (y, height).
+        """
+        y, height, _ = self.cam.calibrate_roi()
+        return y, height
+
+    def read(self):
+        return self.acquire(1)
+
+    def read_peak(self):
+        data, _, vmax = self.cam.acquireBinned(1, ybin=False)
+        return np.flipud(data), vmax
+
+    def read_mask(self):
+        data, colmax = self.cam.acquireColumns(1)
+        return np.flipud(data), np.flipud(colmax) >= self.satlevel
+
+    def acquire(self, N = 1):
+        data, _, mint = self.cam.acquireBinned(N, ybin=False)
+        return np.flipud(data), mint >= self.satlevel
+
+
+@register_backend
+class OceanOpticsBackend(Spectrometer):
+    """OceanOptics' spectrometers through `python-seabreeze`.
+    """
+    name = "OO"
+    label = "OceanOptics"
+    capabilities = frozenset([CAP_EXPOSURE])
+    dtype = np.float64
+    active_pixels = (1, -1)    # first and last pixel are not usable
+
+    @staticmethod
+    def _import():
+        import seabreeze
+        seabreeze.use('pyseabreeze')
+        import seabreeze.spectrometers as sb
+        return sb
+
+    @classmethod
+    def available(cls):
+        try:
+            return len(cls._import().list_devices()) > 0
+        except Exception:
+            return False
+
+    def connect(self):
+        sb = self._import()
+        devices = sb.list_devices()
+        if self.device is not None:
+            devices = [d for d in devices if d.serial_number == self.device]
+        self.cam = sb.Spectrometer(devices[0])
+
+        self.exp = self.cam.minimum_integration_time_micros / 1000 + 1.0
+        self.cam.integration_time_micros(self.exp * 1000)
+        self.expmin, self.expmax, self.expinc = self.exp, 65000, 2
+        self.satlevel = self.cam._dev.interface._MAX_PIXEL_VALUE
+
+    def close(self):
+        self.cam.close()
+
+    def wavelengths(self):
+        return self.cam.wavelengths()[self.active_pixels[0]:self.active_pixels[1]]
+
+    @classmethod
+    def devices(cls):
+        try:
+            return [d.serial_number for d in cls._import().list_devices()]
+        except Exception:
+            return []
+
+    def device_id(self):
+        return "%s_%s" % (self.name, self.cam.serial_number)
+
+    def get_exposure(self):
+        return self.exp
+
+    def set_exposure(self, exp):
+        self.exp = exp
+        self.cam.integration_time_micros(exp * 1000.0)
+
+    def get_exposure_limits(self):
+        return self.expmin, self.expmax, self.expinc
+
+    def read_peak(self):
+        data = self.cam.intensities()[self.active_pixels[0]:self.active_pixels[1]]
+        return data, np.amax(data)
+
+
+@register_backend
+class SimulatedBackend(UC480Backend):
+    """Simulated uc480 camera (see :py:class:`drivers.uc480.simulated.SimulatedCamera`) showing a lamp spectrum with realistic noise, saturation and timing. Used when no other device is connected.
+    """
+    name = "simulated"
+    label = "Simulated device"
+    simulated = True
+    count = 1        # number of simulated devices returned by devices()
+
+    @staticmethod
+    def _camera():
+        from drivers.uc480.simulated import SimulatedCamera
+        return SimulatedCamera()
+
+    @classmethod
+    def available(cls):
+        return True
+
+    @classmethod
+    def devices(cls):
+        return list(range(1, cls.count + 1))
+
+    def wavelengths(self):
+        return np.flipud(self.cam.wavelengths())
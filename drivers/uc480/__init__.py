@@ -28,8 +28,10 @@ import platform
 _linux = (platform.system() == "Linux")
 import numpy as np
 import sys
+import json
+import math
 
-from uc480_h import *
+from .uc480_h import *
 
 VERBOSE = False
 
@@ -65,6 +67,110 @@ def assrt(retVal, fname = ""):
         raise uc480Error(retVal, "Error: uc480 function call failed! Error code = " + str(retVal), fname)
     return retVal
 
+# ##########################################################################################################
+# binning / subsampling factors -> (vertical, horizontal) mode flags
+_binning_modes = ({1: IS_BINNING_DISABLE, 2: IS_BINNING_2X_VERTICAL, 3: IS_BINNING_3X_VERTICAL, 4: IS_BINNING_4X_VERTICAL,
+                   5: IS_BINNING_5X_VERTICAL, 6: IS_BINNING_6X_VERTICAL, 8: IS_BINNING_8X_VERTICAL, 16: IS_BINNING_16X_VERTICAL},
+                  {1: IS_BINNING_DISABLE, 2: IS_BINNING_2X_HORIZONTAL, 3: IS_BINNING_3X_HORIZONTAL, 4: IS_BINNING_4X_HORIZONTAL,
+                   5: IS_BINNING_5X_HORIZONTAL, 6: IS_BINNING_6X_HORIZONTAL, 8: IS_BINNING_8X_HORIZONTAL, 16: IS_BINNING_16X_HORIZONTAL})
+_subsampling_modes = ({1: IS_SUBSAMPLING_DISABLE, 2: IS_SUBSAMPLING_2X_VERTICAL, 3: IS_SUBSAMPLING_3X_VERTICAL, 4: IS_SUBSAMPLING_4X_VERTICAL,
+                       5: IS_SUBSAMPLING_5X_VERTICAL, 6: IS_SUBSAMPLING_6X_VERTICAL, 8: IS_SUBSAMPLING_8X_VERTICAL, 16: IS_SUBSAMPLING_16X_VERTICAL},
+                      {1: IS_SUBSAMPLING_DISABLE, 2: IS_SUBSAMPLING_2X_HORIZONTAL, 3: IS_SUBSAMPLING_3X_HORIZONTAL, 4: IS_SUBSAMPLING_4X_HORIZONTAL,
+                       5: IS_SUBSAMPLING_5X_HORIZONTAL, 6: IS_SUBSAMPLING_6X_HORIZONTAL, 8: IS_SUBSAMPLING_8X_HORIZONTAL, 16: IS_SUBSAMPLING_16X_HORIZONTAL})
+
+# ##########################################################################################################
+# trigger modes, see uc480.set_trigger
+TRIGGER_OFF = "off"              # free running; single frames are taken by software
+TRIGGER_RISING = "rising"        # rising edge at the trigger input
+TRIGGER_FALLING = "falling"      # falling edge at the trigger input
+TRIGGER_SOFTWARE = "software"    # frames are taken on uc480.force_trigger
+
+_trigger_modes = {TRIGGER_OFF: IS_SET_TRIGGER_OFF, TRIGGER_RISING: IS_SET_TRIGGER_LO_HI,
+                  TRIGGER_FALLING: IS_SET_TRIGGER_HI_LO, TRIGGER_SOFTWARE: IS_SET_TRIGGER_SOFTWARE}
+
+# ##########################################################################################################
+# frame accumulation
+def accumulator_dtype(dtype, N):
+    """Returns the smallest unsigned integer type that can hold the sum of N frames of the given integer type without overflow, i.e. uint32 for up to 16843009 8-bit or 65537 16-bit frames and uint64 otherwise.
+
+    :param dtype: Data type of the frames.
+    :param int N: Number of frames to sum.
+    """
+    if np.iinfo(dtype).max * int(N) <= np.iinfo(np.uint32).max:
+        return np.uint32
+    return np.uint64
+
+def average_frames(frames, N, dtype = None, timer = None):
+    """Average N frames using an integer accumulator.
+
+    The frames are summed in place into a single preallocated accumulator and converted to float only once at the end. As integer sums are exact, the result is identical to summing the frames as floats.
+
+    :param frames: Iterable of integer frames (numpy arrays) of identical shape. Frames may be views that are only valid until the next frame is requested.
+    :param int N: Number of frames to average.
+    :param dtype: Data type of the accumulator. If None, it is selected using :py:func:`accumulator_dtype`.
+    :param timer: :py:class:`uvvis.timing.StageTimer` that records the float conversion as stage "convert" or None.
+    :returns: Averaged frame as float array.
+    """
+    accu = None
+    for frame in frames:
+        if accu is None:
+            if dtype is None:
+                dtype = accumulator_dtype(frame.dtype, N)
+            accu = np.empty(frame.shape, dtype=dtype)
+            np.copyto(accu, frame)
+        else:
+            np.add(accu, frame, out=accu)
+    if timer is not None:
+        with timer.measure("convert"):
+            return accu / float(N)
+    return accu / float(N)
+
+def bin_frames(frames, N, xbin = True, ybin = True, maximum = True, timer = None):
+    """Average N frames in binned form without building the averaged image.
+
+    Each frame is reduced right away to its column and row sums, which are accumulated in integer arrays, so that the memory needed per frame is proportional to width + height instead of width x height.
+
+    :param frames: Iterable of integer frames (numpy arrays) of identical shape. Frames may be views that are only valid until the next frame is requested.
+    :param int N: Number of frames to average.
+    :param bool xbin: Return the frames binned over the first (y) axis, i.e. the column sums.
+    :param bool ybin: Return the frames binned over the second (x) axis, i.e. the row sums.
+    :param bool maximum: Return the maximum pixel value.
+    :param timer: :py:class:`uvvis.timing.StageTimer` that records the float conversion as stage "convert" or None.
+    :returns: - Averaged 1d array fully binned over the y-axis (or None if `xbin` is False).
+              - Averaged 1d array fully binned over the x-axis (or None if `ybin` is False).
+              - Maximum raw pixel value found in any of the frames (or None if `maximum` is False).
+    """
+    xaccu, xtmp, yaccu, ytmp, vmax = None, None, None, None, None
+    for frame in frames:
+        if xbin:
+            if xaccu is None:
+                dtype = accumulator_dtype(frame.dtype, N * frame.shape[0])
+                xaccu = np.zeros(frame.shape[1:], dtype=dtype)
+                xtmp = np.empty(frame.shape[1:], dtype=dtype)
+            np.sum(frame, axis=0, dtype=xtmp.dtype, out=xtmp)
+            np.add(xaccu, xtmp, out=xaccu)
+        if ybin:
+            if yaccu is None:
+                dtype = accumulator_dtype(frame.dtype, N * frame.shape[1])
+                yaccu = np.zeros((frame.shape[0],) + frame.shape[2:], dtype=dtype)
+                ytmp = np.empty((frame.shape[0],) + frame.shape[2:], dtype=dtype)
+            np.sum(frame, axis=1, dtype=ytmp.dtype, out=ytmp)
+            np.add(yaccu, ytmp, out=yaccu)
+        if maximum:
+            fmax = np.amax(frame)
+            if vmax is None or fmax > vmax:
+                vmax = fmax
+
+    if timer is not None:
+        t0 = timer.now()
+    if xaccu is not None:
+        xaccu = xaccu / float(N)
+    if yaccu is not None:
+        yaccu = yaccu / float(N)
+    if timer is not None:
+        timer.record("convert", t0, timer.now())
+    return xaccu, yaccu, vmax
+
 # ##########################################################################################################
 # Camera Class
 class uc480:
@@ -79,12 +185,33 @@ class uc480:
         self._lib = None
         self._cam_list = []
         self._camID = None
+        self._deviceID = None
+        self._serial = ""
         self._swidth = 0
         self._sheight = 0
+        self._width = 0
+        self._height = 0
         self._rgb = 0
+        self._rows = None
 
         self._image = None
         self._imgID = None
+        self._imageview = None
+
+        # ring buffer for continuous capture
+        self._seq = None
+        self._seqview = None
+        self._seqlast = -1
+        self._seqlocked = None
+        self._lastframe = None
+        self._dropped = 0
+
+        # trigger mode and timeout in ms
+        self._trigger = TRIGGER_OFF
+        self._trigtimeout = 1000
+
+        # per-stage timing of the acquisition, see uvvis.timing
+        self.timer = None
 
         # library initialization
         # connect to uc480 DLL
@@ -176,6 +303,8 @@ class uc480:
     # query number of connected cameras and retrieve a list with CameraIDs
     def get_cameras(self):
         """Queries the number of connected cameras and prints a list with the available CameraIDs.
+
+        :returns: List of the connected cameras, see :py:func:`cameras`.
         """
         nCams = ctypes.c_int()
         self.call("is_GetNumberOfCameras", ptr(nCams))
@@ -188,22 +317,58 @@ class uc480:
             for i in range(self._cam_list.dwCount):
                 camera = self._cam_list.uci[i]
                 print("Camera #%d: SerNo = %s, CameraID = %d, DeviceID = %d" % (i, camera.SerNo, camera.dwCameraID, camera.dwDeviceID))
+        return self.cameras()
+
+    def cameras(self):
+        """Returns the cameras found by the last call to :py:func:`get_cameras`.
+
+        :returns: List of tuples (serial number, camera ID, device ID). The device ID is unique for each camera, while the camera ID can be set by the user and defaults to 1.
+
+        .. versionadded:: 16-10-2026
+        """
+        if not self._cam_list:
+            return []
+        cams = []
+        for i in range(self._cam_list.dwCount):
+            camera = self._cam_list.uci[i]
+            cams.append((camera.SerNo.decode("ascii", "ignore").strip(), camera.dwCameraID, camera.dwDeviceID))
+        return cams
 
     # connect to camera with given cameraID; if cameraID = 0, connect to first available camera
-    def connect(self, cameraID = 0):
+    def connect(self, cameraID = 0, deviceID = None):
         """Connect to the camera with the given cameraID. If cameraID is 0, connect to the first available camera. When connected, sensor information is read out, image memory is reserved and some default parameters are submitted.
 
+        Several cameras can be connected at the same time using one instance of this class per camera. As camera IDs are not necessarily unique, use the device ID (see :py:func:`cameras`) in this case.
+
         :param int cameraID: Number of camera to connect to. Set this to 0 to connect to the first available camera.
+        :param int deviceID: If not None, connect to the camera with this device ID instead and ignore `cameraID`.
+
+        .. versionchanged:: 16-10-2026
+           The camera ID is no longer ignored; added `deviceID`.
         """
         # connect to camera
-        self._camID = HCAM()
+        if deviceID is not None:
+            self._camID = HCAM(int(deviceID) | IS_USE_DEVICE_ID)
+        else:
+            self._camID = HCAM(int(cameraID))
         self.call("is_InitCamera", ptr(self._camID), None)
 
+        # get serial number
+        pCamInfo = CAMINFO()
+        self.call("is_GetCameraInfo", self._camID, ptr(pCamInfo))
+        self._serial = pCamInfo.SerNo.decode("ascii", "ignore")
+        self._deviceID = None
+        for serial, camID, devID in self.cameras():
+            if serial == self._serial.strip():
+                self._deviceID = devID
+
         # get sensor info
         pInfo = SENSORINFO()
         self.call("is_GetSensorInfo", self._camID, ptr(pInfo))
         self._swidth = pInfo.nMaxWidth
         self._sheight = pInfo.nMaxHeight
+        self._width = self._swidth
+        self._height = self._sheight
         self._rgb = not (pInfo.nColorMode == IS_COLORMODE_MONOCHROME)
         if self._rgb:
             self.call("is_SetColorMode", self._camID, IS_CM_RGB8_PACKED)
@@ -221,6 +386,7 @@ class uc480:
         # set default parameters
         self.call("is_ResetToDefault", self._camID)
         self.call("is_SetExternalTrigger", self._camID, IS_SET_TRIGGER_OFF)
+        self._trigger = TRIGGER_OFF
         self.call("is_SetGainBoost", self._camID, IS_SET_GAINBOOST_OFF)
         self.call("is_SetHardwareGain", self._camID, 0, IS_IGNORE_PARAMETER, IS_IGNORE_PARAMETER, IS_IGNORE_PARAMETER)
         self.call("is_Blacklevel", self._camID, IS_BLACKLEVEL_CMD_SET_MODE, ptr(ctypes.c_int(IS_AUTO_BLACKLEVEL_OFF)), ctypes.sizeof(ctypes.c_int))
@@ -233,6 +399,8 @@ class uc480:
     def disconnect(self):
         """Disconnect a currently connected camera.
         """
+        if self._seq is not None:
+            self.stop_capture()
         self.call("is_ExitCamera", self._camID)
 
     def stop(self):
@@ -250,7 +418,292 @@ class uc480:
 
         .. versionadded:: 01-07-2016
         """
-        return self._swith, self._sheight
+        return self._swidth, self._sheight
+
+    def get_image_size(self):
+        """Returns the size of the captured images as tuple: (width, height).
+
+        This is the sensor size reduced by the current AOI, binning and subsampling settings.
+
+        .. versionadded:: 16-10-2026
+        """
+        return self._width, self._height
+
+    def get_serial(self):
+        """Returns the serial number of the connected camera.
+
+        .. versionadded:: 16-10-2026
+        """
+        return self._serial.strip()
+
+    def get_temperature(self):
+        """Returns the temperature of the camera in deg C or None if the camera or library does not report it (is_DeviceInfo is only available for some camera models).
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._deviceID is None or getattr(self._lib, "is_DeviceInfo", None) is None:
+            return None
+        info = IS_DEVICE_INFO()
+        try:
+            self.call("is_DeviceInfo", self._deviceID | IS_USE_DEVICE_ID, IS_DEVICE_INFO_CMD_GET_DEVICE_INFO, ptr(info), ctypes.sizeof(info))
+        except uc480Error:
+            return None
+
+        # bit 15: sign, bits 10..4: integer part, bits 3..0: tenths
+        w = info.infoDevHeartbeat.wTemperature
+        temp = ((w >> 4) & 0x7F) + (w & 0x0F) / 10.0
+        return -temp if w & 0x8000 else temp
+
+    # ##########################################################################################################
+    # area of interest, binning and subsampling
+    def set_aoi(self, x, y, width, height):
+        """Set the image area of interest (AOI). Only this part of the sensor is read out and transferred, which reduces the bandwidth and allows for higher frame rates.
+
+        Position and size have to be multiples of the increments supported by the sensor and are given in units of binned / subsampled pixels. The image buffers are resized accordingly.
+
+        :param int x: Horizontal position of the upper left corner.
+        :param int y: Vertical position of the upper left corner.
+        :param int width: Width of the AOI.
+        :param int height: Height of the AOI.
+
+        .. versionadded:: 16-10-2026
+        """
+        rect = IS_RECT()
+        rect.s32X, rect.s32Y, rect.s32Width, rect.s32Height = int(x), int(y), int(width), int(height)
+        self.call("is_AOI", self._camID, IS_AOI_IMAGE_SET_AOI, ptr(rect), ctypes.sizeof(rect))
+        self._update_image_size()
+
+    def get_aoi(self):
+        """Returns the current image AOI as tuple: (x, y, width, height).
+
+        .. versionadded:: 16-10-2026
+        """
+        rect = IS_RECT()
+        self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_AOI, ptr(rect), ctypes.sizeof(rect))
+        return rect.s32X, rect.s32Y, rect.s32Width, rect.s32Height
+
+    def reset_aoi(self):
+        """Reset the image AOI to the full sensor (taking binning and subsampling into account).
+
+        .. versionadded:: 16-10-2026
+        """
+        size = IS_SIZE_2D()
+        self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_SIZE_MAX, ptr(size), ctypes.sizeof(size))
+        self.set_aoi(0, 0, size.s32Width, size.s32Height)
+
+    def set_binning(self, vertical = 1, horizontal = 1):
+        """Set hardware binning, i.e. combine adjacent pixels on the sensor. Vertical binning is best suited to spectrometers where the spectrum is dispersed along the horizontal axis.
+
+        :param int vertical: Vertical binning factor (1, 2, 3, 4, 5, 6, 8, 16).
+        :param int horizontal: Horizontal binning factor (1, 2, 3, 4, 5, 6, 8, 16).
+        :raises uc480Error: if the factor is not supported by the library or the camera.
+
+        .. versionadded:: 16-10-2026
+        """
+        mode = self._factor_to_mode(_binning_modes, vertical, horizontal, "set_binning")
+        self.call("is_SetBinning", self._camID, mode)
+        self._update_image_size()
+
+    def get_binning(self):
+        """Returns the current binning factors as tuple: (vertical, horizontal).
+
+        .. versionadded:: 16-10-2026
+        """
+        return (self.query("is_SetBinning", self._camID, IS_GET_BINNING_FACTOR_VERTICAL),
+                self.query("is_SetBinning", self._camID, IS_GET_BINNING_FACTOR_HORIZONTAL))
+
+    def set_subsampling(self, vertical = 1, horizontal = 1):
+        """Set hardware subsampling, i.e. skip pixels on the sensor.
+
+        :param int vertical: Vertical subsampling factor (1, 2, 3, 4, 5, 6, 8, 16).
+        :param int horizontal: Horizontal subsampling factor (1, 2, 3, 4, 5, 6, 8, 16).
+        :raises uc480Error: if the factor is not supported by the library or the camera.
+
+        .. versionadded:: 16-10-2026
+        """
+        mode = self._factor_to_mode(_subsampling_modes, vertical, horizontal, "set_subsampling")
+        self.call("is_SetSubSampling", self._camID, mode)
+        self._update_image_size()
+
+    def get_subsampling(self):
+        """Returns the current subsampling factors as tuple: (vertical, horizontal).
+
+        .. versionadded:: 16-10-2026
+        """
+        return (self.query("is_SetSubSampling", self._camID, IS_GET_SUBSAMPLING_FACTOR_VERTICAL),
+                self.query("is_SetSubSampling", self._camID, IS_GET_SUBSAMPLING_FACTOR_HORIZONTAL))
+
+    # convert vertical and horizontal factors into binning / subsampling mode flags
+    def _factor_to_mode(self, modes, vertical, horizontal, fname):
+        try:
+            return modes[0][int(vertical)] | modes[1][int(horizontal)]
+        except KeyError:
+            raise uc480Error(IS_INVALID_PARAMETER, "Error: unsupported factor %s x %s!" % (vertical, horizontal), fname)
+
+    # ##########################################################################################################
+    # spectral region of interest
+    def find_spectral_rows(self, N = 10, threshold = 0.5, margin = 2):
+        """Find the rows of the current image that are illuminated by the dispersed spectrum.
+
+        The frames are binned along the horizontal axis to give a vertical intensity profile. Starting from the brightest row, all adjacent rows whose intensity is above `threshold` between background (median of the profile) and peak are part of the spectral stripe. Any active row restriction (see :py:func:`set_roi`) is ignored.
+
+        :param int N: Number of frames to average.
+        :param float threshold: Relative threshold (0 - 1) between background and peak.
+        :param int margin: Number of rows added on either side of the stripe.
+        :returns: First row and number of rows of the stripe (y, height) in image coordinates.
+
+        .. versionadded:: 16-10-2026
+        """
+        rows, self._rows = self._rows, None
+        try:
+            _, profile, _ = self.acquireBinned(N, xbin=False, maximum=False)
+        finally:
+            self._rows = rows
+        if profile.ndim > 1:
+            profile = np.sum(profile, axis=1)
+
+        bg = np.median(profile)
+        peak = np.argmax(profile)
+        above = profile >= bg + threshold * (profile[peak] - bg)
+
+        y0 = peak
+        while y0 > 0 and above[y0 - 1]:
+            y0 -= 1
+        y1 = peak
+        while y1 < len(profile) - 1 and above[y1 + 1]:
+            y1 += 1
+
+        y0 = max(0, int(y0) - int(margin))
+        y1 = min(len(profile) - 1, int(y1) + int(margin))
+        return y0, y1 - y0 + 1
+
+    def set_roi(self, y, height, hardware = True):
+        """Restrict the acquisition to the rows y .. y + height - 1 of the current image, e.g. the spectral stripe found by :py:func:`find_spectral_rows`.
+
+        :param int y: First row.
+        :param int height: Number of rows.
+        :param bool hardware: If True, set the image AOI of the camera so that only these rows are read out (rounded to the supported increments, widened to the minimum AOI height and clipped to the sensor). If False, the full image is read out but only these rows are returned by :py:func:`acquire` and used by :py:func:`acquireBinned`.
+
+        .. versionadded:: 16-10-2026
+        """
+        if hardware:
+            x, y0, width, _ = self.get_aoi()
+            posinc, sizeinc = IS_POINT_2D(), IS_POINT_2D()
+            smin, smax = IS_SIZE_2D(), IS_SIZE_2D()
+            self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_POS_INC, ptr(posinc), ctypes.sizeof(posinc))
+            self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_SIZE_INC, ptr(sizeinc), ctypes.sizeof(sizeinc))
+            self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_SIZE_MIN, ptr(smin), ctypes.sizeof(smin))
+            self.call("is_AOI", self._camID, IS_AOI_IMAGE_GET_SIZE_MAX, ptr(smax), ctypes.sizeof(smax))
+            ymax = smax.s32Height
+
+            # rows on the sensor, rounded outwards to the increments
+            ystart = min(max(0, y0 + int(y)), ymax - 1)
+            yend = min(max(ystart + 1, ystart + int(height)), ymax)
+            if posinc.s32Y > 1:
+                ystart -= ystart % posinc.s32Y
+            h = max(yend - ystart, smin.s32Height)
+            if sizeinc.s32Y > 1:
+                h += (-h) % sizeinc.s32Y
+            h = min(h, ymax)
+
+            # move the AOI up if it extends beyond the sensor
+            ystart = min(ystart, ymax - h)
+            if posinc.s32Y > 1:
+                ystart -= ystart % posinc.s32Y
+            self._rows = None
+            self.set_aoi(x, ystart, width, h)
+        else:
+            y = max(0, int(y))
+            self._rows = (y, max(1, min(int(height), self._height - y)))
+
+    def get_roi(self):
+        """Returns the rows used for acquisition as tuple (y, height, hardware). For a hardware ROI, y is the position of the image AOI on the sensor.
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._rows is not None:
+            return self._rows[0], self._rows[1], False
+        _, y, _, height = self.get_aoi()
+        return y, height, True
+
+    def clear_roi(self):
+        """Remove any row restriction and reset the image AOI to the full sensor.
+
+        .. versionadded:: 16-10-2026
+        """
+        self._rows = None
+        self.reset_aoi()
+
+    def calibrate_roi(self, N = 10, threshold = 0.5, margin = 2, hardware = True, filename = None):
+        """Locate the spectral stripe on the full sensor, restrict the acquisition to it and store the result in the camera profile.
+
+        :param int N: Number of frames to average.
+        :param float threshold: Relative threshold (0 - 1) between background and peak (see :py:func:`find_spectral_rows`).
+        :param int margin: Number of rows added on either side of the stripe.
+        :param bool hardware: Use the image AOI (True) or restrict the data reduction only (False).
+        :param str filename: Name of the profile file (see :py:func:`save_profile`).
+        :returns: ROI as returned by :py:func:`get_roi`.
+
+        .. versionadded:: 16-10-2026
+        """
+        self.clear_roi()
+        y, height = self.find_spectral_rows(N, threshold, margin)
+        self.set_roi(y, height, hardware)
+        self.save_profile(filename)
+        return self.get_roi()
+
+    def get_profile_name(self):
+        """Returns the default filename of the camera profile, which is *uc480_<serial number>.json* in the working directory.
+
+        .. versionadded:: 16-10-2026
+        """
+        return "uc480_%s.json" % self._serial.strip()
+
+    def save_profile(self, filename = None):
+        """Save the camera specific settings, i.e. the ROI, to a profile file.
+
+        :param str filename: Name of the profile file. If None, use :py:func:`get_profile_name`.
+
+        .. versionadded:: 16-10-2026
+        """
+        if filename is None:
+            filename = self.get_profile_name()
+        y, height, hardware = self.get_roi()
+        with open(filename, "w") as f:
+            json.dump({"serial": self._serial, "roi": [y, height], "hardware": hardware}, f)
+
+    def load_profile(self, filename = None):
+        """Load camera specific settings from a profile file written by :py:func:`save_profile` and apply them.
+
+        :param str filename: Name of the profile file. If None, use :py:func:`get_profile_name`.
+        :returns: True if the profile was found and applied.
+
+        .. versionadded:: 16-10-2026
+        """
+        if filename is None:
+            filename = self.get_profile_name()
+        if not os.path.exists(filename):
+            return False
+        with open(filename, "r") as f:
+            profile = json.load(f)
+        y, height = profile["roi"]
+        if profile.get("hardware", True):
+            self.reset_aoi()
+        self.set_roi(y, height, profile.get("hardware", True))
+        return True
+
+    # read back the image size after changing AOI, binning or subsampling and resize the image buffers
+    def _update_image_size(self):
+        nbuffers = len(self._seq) if self._seq is not None else 0
+        if nbuffers:
+            self.stop_capture()
+
+        _, _, self._width, self._height = self.get_aoi()
+        self._rows = None
+        self.create_buffer()
+
+        if nbuffers:
+            self.start_capture(nbuffers)
 
     # set hardware gain (0..100)
     def set_gain(self, gain):
@@ -308,6 +761,86 @@ class uc480:
         """
         return self.expmin, self.expmax, self.expinc
 
+    # ##########################################################################################################
+    # trigger
+    def set_trigger(self, edge = TRIGGER_RISING, delay = 0, timeout = 1000):
+        """Set the trigger mode.
+
+        With a hardware trigger, each frame is exposed on the selected edge of the TTL signal at the trigger input, after `delay`. In single frame mode, `is_FreezeVideo` waits for the next trigger. During continuous capture (:py:func:`start_capture`), the camera is armed once and the driver stores every triggered frame in the ring buffer without any calls from Python, so that frames triggered at high rates are queued until they are read with :py:func:`get_frame`. If capture is running, it is restarted with the new settings, i.e. queued frames are lost.
+
+        :param str edge: TRIGGER_OFF (free running), TRIGGER_RISING, TRIGGER_FALLING or TRIGGER_SOFTWARE (frames are taken on :py:func:`force_trigger`).
+        :param int delay: Delay between the trigger edge and the start of the exposure in us. It is rounded by the camera, see :py:func:`get_trigger_delay_limits`.
+        :param float timeout: Time in ms to wait for a trigger before a frame request fails. The camera applies it in steps of 10 ms.
+        :raises uc480Error: if the camera does not support the trigger mode.
+
+        .. versionadded:: 16-10-2026
+        """
+        if edge not in _trigger_modes:
+            raise uc480Error(IS_INVALID_PARAMETER, "Error: unknown trigger mode %s!" % edge, "set_trigger")
+        mode = _trigger_modes[edge]
+        if edge != TRIGGER_OFF:
+            supported = self.query("is_SetExternalTrigger", self._camID, IS_GET_SUPPORTED_TRIGGER_MODE)
+            if not (supported & mode & ~IS_SET_TRIGGER_CONTINUOUS):
+                raise uc480Error(IS_INVALID_PARAMETER, "Error: trigger mode %s is not supported by this camera!" % edge, "set_trigger")
+
+        # the trigger mode cannot be changed while the camera is capturing
+        nbuffers = len(self._seq) if self._seq is not None else 0
+        if nbuffers:
+            self.stop_capture()
+
+        self.call("is_SetExternalTrigger", self._camID, mode)
+        self.call("is_SetTriggerDelay", self._camID, int(round(delay)))
+        self.call("is_SetTimeout", self._camID, IS_TRIGGER_TIMEOUT, max(1, int(math.ceil(timeout / 10.0))))
+        self._trigger = edge
+        self._trigtimeout = timeout
+
+        if nbuffers:
+            self.start_capture(nbuffers)
+
+    def get_trigger(self):
+        """Returns the trigger settings (*edge, delay in us, timeout in ms*), see :py:func:`set_trigger`.
+
+        .. versionadded:: 16-10-2026
+        """
+        return self._trigger, self.query("is_SetTriggerDelay", self._camID, IS_GET_TRIGGER_DELAY), self._trigtimeout
+
+    def get_trigger_delay_limits(self):
+        """Returns the supported limits for the trigger delay in us (*min, max, increment*).
+
+        .. versionadded:: 16-10-2026
+        """
+        return (self.query("is_SetTriggerDelay", self._camID, IS_GET_MIN_TRIGGER_DELAY),
+                self.query("is_SetTriggerDelay", self._camID, IS_GET_MAX_TRIGGER_DELAY),
+                self.query("is_SetTriggerDelay", self._camID, IS_GET_TRIGGER_DELAY_GRANULARITY))
+
+    def force_trigger(self):
+        """Take a frame in software trigger mode (TRIGGER_SOFTWARE), or take a frame right away while waiting for a hardware trigger.
+
+        .. versionadded:: 16-10-2026
+        """
+        self.call("is_ForceTrigger", self._camID)
+
+    def get_trigger_counters(self):
+        """Returns the number of trigger events received by the camera and the number of triggers that were missed because the camera was still busy with the previous frame (*events, missed*).
+
+        .. versionadded:: 16-10-2026
+        """
+        return (self.query("is_CameraStatus", self._camID, IS_EXT_TRIGGER_EVENT_CNT, IS_GET_STATUS),
+                self.query("is_CameraStatus", self._camID, IS_TRIGGER_MISSED, IS_GET_STATUS))
+
+    # time in ms to wait for the next frame; with a hardware trigger, this includes the trigger timeout
+    def _frame_timeout(self):
+        if self._trigger in (TRIGGER_RISING, TRIGGER_FALLING):
+            return self._trigtimeout + 1000
+        return 1000
+
+    # allocate a single image memory of the current image size
+    def _alloc_image_mem(self):
+        mem = ctypes.c_char_p()
+        memID = ctypes.c_int()
+        self.call("is_AllocImageMem", self._camID, self._width, self._height, self._bitsperpixel, ptr(mem), ptr(memID))
+        return mem, memID
+
     # create image buffers
     def create_buffer(self):
         """Create image buffer for raw data from camera.
@@ -317,68 +850,359 @@ class uc480:
         # allocate memory for raw data from camera
         if self._image:
             self.call("is_FreeImageMem", self._camID, self._image, self._imgID)
-        self._image = ctypes.c_char_p()
-        self._imgID = ctypes.c_int()
-        self.call("is_AllocImageMem", self._camID, self._swidth, self._sheight, self._bitsperpixel, ptr( self._image ), ptr( self._imgID ))
+        self._image, self._imgID = self._alloc_image_mem()
         self.call("is_SetImageMem", self._camID, self._image, self._imgID)
+        # the pitch is queried from the active image memory, so the view is created after activating it
+        self._imageview = self._wrap_image_mem(self._image)
+
+    # create a read-only numpy view on a camera image memory without copying the data
+    def _wrap_image_mem(self, mem):
+        bpp = self._bitsperpixel // 8
+        pitch = ctypes.c_int()
+        self.call("is_GetImageMemPitch", self._camID, ptr(pitch))
+        pitch = max(pitch.value, self._width * bpp)
+
+        view = np.ctypeslib.as_array(ctypes.cast(mem, ctypes.POINTER(ctypes.c_ubyte)), shape=(self._height, pitch))
+        view = view[:, :self._width * bpp]
+        if bpp > 1:
+            view = view.reshape((self._height, self._width, bpp))
+        view.flags.writeable = False
+        return view
+
+    # copy data from a camera image memory to a new numpy frame buffer
+    def _copy_image_mem(self, mem, memID):
+        # create usable numpy array for frame data
+        if(self._bitsperpixel == 8):
+            _framedata = np.zeros((self._height, self._width), dtype=np.uint8)
+        else:
+            _framedata = np.zeros((self._height, self._width, 3), dtype=np.uint8)
+
+        self.call("is_CopyImageMem", self._camID, mem, memID, _framedata.ctypes.data_as(ctypes.c_char_p))
+        return _framedata
 
     # copy data from camera buffer to numpy frame buffer and return typecast to float
-    def get_buffer(self):
+    def get_buffer(self, copy = True):
         """Copy data from camera buffer to numpy array and return typecast to uint8.
 
+        :param bool copy: If False, do not copy the data but return a read-only view on the camera's image memory. The view is only valid until the next frame is captured and must not be used after the buffer was freed.
+
         .. note:: This function is internally used by :py:func:`acquire`, :py:func:`acquireBinned`, and :py:func:`acquireMax` and there is normally no reason to directly call it.
         """
-        # create usable numpy array for frame data
-        if(self._bitsperpixel == 8):
-            _framedata = np.zeros((self._sheight, self._swidth), dtype=np.uint8)
-        else:
-            _framedata = np.zeros((self._sheight, self._swidth, 3), dtype=np.uint8)
+        if not copy:
+            return self._imageview
+        return self._copy_image_mem(self._image, self._imgID)
 
-        self.call("is_CopyImageMem", self._camID, self._image, self._imgID, _framedata.ctypes.data_as(ctypes.c_char_p))
-        return _framedata
+    # ##########################################################################################################
+    # continuous capture into a ring buffer of image memories
+    def start_capture(self, nbuffers = 8):
+        """Start continuous (free running) capture into a ring buffer of image memories.
+
+        Instead of triggering every single frame with `is_FreezeVideo`, the camera runs continuously (or takes a frame on every trigger, see :py:func:`set_trigger`) and the driver fills the image memories of the sequence one after the other, so that exposure, readout and copying of successive frames overlap. Use :py:func:`get_frame` or :py:func:`frames` to read the frames in the order they were recorded and :py:func:`stop_capture` to return to single frame mode. While capture is running, :py:func:`acquire` and all functions based on it read from the ring buffer as well.
+
+        :param int nbuffers: Number of image memories in the ring buffer (>= 2).
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._seq is not None:
+            self.stop_capture()
+
+        self._seq = []
+        for i in range(max(2, int(nbuffers))):
+            mem, memID = self._alloc_image_mem()
+            self.call("is_AddToSequence", self._camID, mem, memID)
+            self._seq.append((mem, memID))
+        self._seqaddr = [ctypes.cast(mem, ctypes.c_void_p).value for mem, _ in self._seq]
+        self._seqview = [self._wrap_image_mem(mem) for mem, _ in self._seq]
+        self._seqlast = -1
+        self._seqlocked = None
+        self._lastframe = None
+        self._dropped = 0
+
+        self.call("is_EnableEvent", self._camID, IS_SET_EVENT_FRAME)
+        self.call("is_CaptureVideo", self._camID, IS_DONT_WAIT)
+
+    def stop_capture(self):
+        """Stop continuous capture, release the ring buffer and return to single frame mode.
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._seq is None:
+            return
+        self.release_frame()
+        self.call("is_StopLiveVideo", self._camID, IS_WAIT)
+        self.call("is_DisableEvent", self._camID, IS_SET_EVENT_FRAME)
+        self.call("is_ClearSequence", self._camID)
+        for mem, memID in self._seq:
+            self.call("is_FreeImageMem", self._camID, mem, memID)
+        self._seq = None
+        self._seqview = None
+        if self._dropped > 0:
+            print("WARNING: %d frame(s) were dropped during continuous capture.." % self._dropped)
+
+        # restore the image memory for single frame mode
+        if self._image:
+            self.call("is_SetImageMem", self._camID, self._image, self._imgID)
+
+    def is_capturing(self):
+        """Returns True if continuous capture is running.
+
+        .. versionadded:: 16-10-2026
+        """
+        return self._seq is not None
+
+    def get_dropped_frames(self):
+        """Returns the number of frames that were lost since continuous capture was started, i.e. frames that were overwritten in the ring buffer before they could be read or that the driver reported as missing.
+
+        .. versionadded:: 16-10-2026
+        """
+        return self._dropped
+
+    # index of the image memory of the sequence that was filled last or -1 if there is none yet
+    def _last_seq_buffer(self):
+        nNum = ctypes.c_int()
+        pcMem = ctypes.c_void_p()
+        pcMemLast = ctypes.c_void_p()
+        self.call("is_GetActSeqBuf", self._camID, ptr(nNum), ptr(pcMem), ptr(pcMemLast))
+        if nNum.value == 0 or pcMemLast.value not in self._seqaddr:
+            return -1
+        return self._seqaddr.index(pcMemLast.value)
+
+    # wait for the frame event; returns False on timeout
+    def _wait_frame_event(self, timeout):
+        if getattr(self._lib, "is_WaitEvent", None) is not None:
+            return self.query("is_WaitEvent", self._camID, IS_SET_EVENT_FRAME, int(timeout)) == IS_SUCCESS
+        # older library versions without is_WaitEvent: poll the sequence
+        t0 = time.time()
+        while self._next_seq_buffer() is None:
+            if (time.time() - t0) * 1000.0 > timeout:
+                return False
+            time.sleep(0.001)
+        return True
+
+    # frame counter of the image in the given memory of the sequence or None if it is not available
+    def _frame_number(self, memID):
+        pInfo = UC480IMAGEINFO()
+        if self.query("is_GetImageInfo", self._camID, memID, ptr(pInfo), ctypes.sizeof(pInfo)) != IS_SUCCESS:
+            return None
+        return pInfo.u64FrameNumber
+
+    # (index, frame counter) of the buffer holding the oldest frame that was not read yet or None if there is none
+    # the driver does not fill the buffers strictly in ring order, it skips locked buffers and overwrites the oldest ones
+    # when the ring buffer overflows; the buffers are therefore ordered by their frame counters
+    def _next_seq_buffer(self):
+        last = self._last_seq_buffer()
+        if last < 0:
+            return None
+        n = len(self._seq)
+        newest = self._frame_number(self._seq[last][1])
+        if newest is None:
+            # frame counters are not available: assume ring order
+            if last == self._seqlast:
+                return None
+            return (self._seqlast + 1) % n, None
+        if self._lastframe is None:
+            # first frame after starting the capture
+            i = (self._seqlast + 1) % n
+            return i, self._frame_number(self._seq[i][1])
+        if newest <= self._lastframe:
+            return None
+
+        # usually, the next buffer in ring order holds the next frame
+        i = (self._seqlast + 1) % n
+        frame = self._frame_number(self._seq[i][1])
+        if frame == self._lastframe + 1:
+            return i, frame
+
+        # otherwise, look for the oldest frame newer than the last one read
+        best = (last, newest)
+        for j, (mem, memID) in enumerate(self._seq):
+            frame = self._frame_number(memID)
+            if frame is not None and self._lastframe < frame < best[1]:
+                best = (j, frame)
+        return best
+
+    def release_frame(self):
+        """Unlock the ring buffer memory of the last frame returned by :py:func:`get_frame` with `copy = False`. The view on this frame must not be used afterwards.
+
+        .. note:: This is done automatically by the next call to :py:func:`get_frame` and by :py:func:`stop_capture`.
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._seqlocked is not None:
+            self.call("is_UnlockSeqBuf", self._camID, IS_IGNORE_PARAMETER, self._seqlocked)
+            self._seqlocked = None
+
+    def get_frame(self, timeout = None, copy = True):
+        """Return the next frame from the ring buffer while continuous capture is running.
+
+        Frames are returned strictly in the order they were recorded. If the ring buffer overflowed since the last call, i.e. frames were overwritten before they were read, the number of lost frames is added to :py:func:`get_dropped_frames` and a warning is printed.
+
+        :param int timeout: Time in ms to wait for a new frame. If None, wait 1s or, with a hardware trigger, the trigger timeout plus 1s.
+        :param bool copy: If False, return a read-only view on the ring buffer memory instead of a copy. The memory stays locked, i.e. it is skipped by the driver, until :py:func:`release_frame` or the next call to :py:func:`get_frame`.
+        :returns: Frame as uint8 numpy array.
+        :raises uc480Error: if capture is not running or no frame arrived within `timeout`.
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._seq is None:
+            raise uc480Error(IS_SEQUENCE_LIST_EMPTY, "Error: continuous capture is not running!", "get_frame")
+        self.release_frame()
+        if timeout is None:
+            timeout = self._frame_timeout()
+
+        while True:
+            nxt = self._next_seq_buffer()
+            if nxt is None:
+                if not self._wait_frame_event(timeout):
+                    raise uc480Error(IS_TIMED_OUT, "Error: no frame received within %d ms!" % timeout, "get_frame")
+                continue
+
+            i, frame = nxt
+            mem, memID = self._seq[i]
+            self.call("is_LockSeqBuf", self._camID, IS_IGNORE_PARAMETER, mem)
+            self._seqlocked = mem
+            # the buffer may have been overwritten before it was locked
+            if frame is not None and self._frame_number(memID) != frame:
+                self.release_frame()
+                continue
+            break
+
+        if frame is not None:
+            if self._lastframe is not None and frame > self._lastframe + 1:
+                lost = frame - self._lastframe - 1
+                self._dropped += lost
+                print("WARNING: %d frame(s) dropped in continuous capture (%d in total).." % (lost, self._dropped))
+            self._lastframe = frame
+        self._seqlast = i
+        if not copy:
+            return self._seqview[self._seqlast]
+        try:
+            data = self._copy_image_mem(mem, memID)
+        finally:
+            self.release_frame()
+        return data
+
+    def frames(self, N = None, timeout = None, copy = True):
+        """Iterator over the frames of a continuous capture. Starts capture if it is not running yet.
+
+        :param int N: Number of frames to return (None = infinite).
+        :param int timeout: Time in ms to wait for each frame (see :py:func:`get_frame`).
+        :param bool copy: If False, yield read-only views on the ring buffer (see :py:func:`get_frame`). Each view is valid until the iterator is advanced.
+
+        .. versionadded:: 16-10-2026
+        """
+        if self._seq is None:
+            self.start_capture()
+        i = 0
+        try:
+            while N is None or i < N:
+                yield self.get_frame(timeout, copy)
+                i += 1
+        finally:
+            self.release_frame()
 
     # captures N frames and returns the averaged image
-    def acquire(self, N = 1):
+    def acquire(self, N = 1, dtype = None):
         """Synchronously captures some frames from the camera using the current settings and returns the averaged image.
 
         :param int N: Number of frames to acquire (> 1).
+        :param dtype: Data type of the integer accumulator used for summing the frames (see :py:func:`average_frames`). If None, the smallest type that cannot overflow is used.
         :returns: Averaged image.
         """
         if VERBOSE:
             print("acquire %d frames" % N)
+        return average_frames(self._grab_frames(N), N, dtype, self.timer)
+
+    # capture a single frame into the image memory and wait until it is complete
+    def _freeze_frame(self):
+        ret = self.query("is_FreezeVideo", self._camID, IS_WAIT)
+        while ret != IS_SUCCESS:
+            if self._trigger in (TRIGGER_RISING, TRIGGER_FALLING):
+                raise uc480Error(ret, "Error: no trigger received within %d ms!" % self._trigtimeout, "is_FreezeVideo")
+            time.sleep(0.1)
+            ret = self.query("is_FreezeVideo", self._camID, IS_WAIT)
+
+    # yields N frames as views on the camera memory; each view is only valid until the next frame is requested
+    # with a timer, the time spent waiting for the frame, getting the buffer and reducing the frame by the consumer is recorded
+    def _grab_frames(self, N):
         if not self._image:
             if VERBOSE:
                 print("  create buffer..")
             self.create_buffer()
 
-        data = None
-        for i in range(int(N)):
-            if VERBOSE:
-                print("  wait for data..")
-            while self.query("is_FreezeVideo", self._camID, IS_WAIT) != IS_SUCCESS:
-                time.sleep(0.1)
-            if VERBOSE:
-                print("  read data..")
-            if data is None:
-                data = self.get_buffer().astype(float)
-            else:
-                data = data + self.get_buffer()
-        data = data / float(N)
-
-        return data
+        if self._rows is not None:
+            rows = slice(self._rows[0], self._rows[0] + self._rows[1])
+        else:
+            rows = slice(None)
+
+        timer = self.timer
+        try:
+            for i in range(int(N)):
+                if timer is not None:
+                    t0 = timer.now()
+                if self._seq is not None:
+                    frame = self.get_frame(copy=False)
+                    if timer is not None:
+                        t1 = timer.now()
+                        timer.record("wait", t0, t1)
+                else:
+                    if VERBOSE:
+                        print("  wait for data..")
+                    self._freeze_frame()
+                    if timer is not None:
+                        t1 = timer.now()
+                        timer.record("wait", t0, t1)
+                    if VERBOSE:
+                        print("  read data..")
+                    frame = self.get_buffer(copy=False)
+                    if timer is not None:
+                        t0, t1 = t1, timer.now()
+                        timer.record("buffer", t0, t1)
+                yield frame[rows]
+                if timer is not None:
+                    timer.record("reduce", t1, timer.now())
+        finally:
+            self.release_frame()
 
     # captures N frames and returns the fully binned arrays
     # along x and y directions and the maximum intensity in the array
-    def acquireBinned(self, N = 1):
+    def acquireBinned(self, N = 1, xbin = True, ybin = True, maximum = True):
         """Record N frames from the camera using the current settings and return fully binned 1d arrays averaged over the N frames.
 
+        The frames are binned one by one as they arrive (see :py:func:`bin_frames`), i.e. the averaged image is never built. Outputs that are not needed can be switched off to save the corresponding reduction.
+
         :param int N: Number of images to acquire.
-        :returns: - Averaged 1d array fully binned over the x-axis.
-                  - Averaged 1d array fully binned over the y-axis.
-                  - Maximum pixel intensity before binning, e.g. to detect over illumination.
+        :param bool xbin: Calculate the array binned over the x-axis.
+        :param bool ybin: Calculate the array binned over the y-axis.
+        :param bool maximum: Calculate the maximum pixel intensity.
+        :returns: - Averaged 1d array fully binned over the x-axis (None if `xbin` is False).
+                  - Averaged 1d array fully binned over the y-axis (None if `ybin` is False).
+                  - Maximum pixel intensity before binning and averaging, e.g. to detect over illumination (None if `maximum` is False).
         """
-        data = self.acquire(N)
-        return np.sum(data, axis=0), np.sum(data, axis=1), np.amax(data)
+        return bin_frames(self._grab_frames(N), N, xbin, ybin, maximum, self.timer)
+
+    # captures N frames and returns the averaged column sums and the maximum of each column
+    def acquireColumns(self, N = 1):
+        """Record N frames from the camera using the current settings and return the column sums averaged over the N frames together with the maximum raw pixel value of each column, e.g. to detect which spectral points are saturated.
+
+        :param int N: Number of images to acquire.
+        :returns: - Averaged 1d array fully binned over the y-axis.
+                  - Maximum raw pixel value of each column in any of the frames (1d array).
+
+        .. versionadded:: 16-10-2026
+        """
+        xaccu, colmax = None, None
+        for frame in self._grab_frames(N):
+            if xaccu is None:
+                xaccu = np.zeros(frame.shape[1:], dtype=accumulator_dtype(frame.dtype, N * frame.shape[0]))
+                colmax = np.amax(frame, axis=0)
+            else:
+                np.maximum(colmax, np.amax(frame, axis=0), out=colmax)
+            np.add(xaccu, np.sum(frame, axis=0, dtype=xaccu.dtype), out=xaccu)
+        if self.timer is not None:
+            with self.timer.measure("convert"):
+                return xaccu / float(N), colmax
+        return xaccu / float(N), colmax
 
     # returns the column / row with the maximum intensity
     def acquireMax(self, N = 1):
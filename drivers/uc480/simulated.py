@@ -0,0 +1,435 @@
+"""
+.. module: uc480.simulated
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Simulated uc480 camera for testing and benchmarking without hardware.
+
+:py:class:`SimulatedCamera` has the same interface as :py:class:`uc480.uc480` and shares its data reduction (:py:func:`acquire`, :py:func:`acquireBinned`, ROI handling, ..). Only the hardware layer is replaced: the frames show the spectrum of a lamp with atomic emission lines on top of a broad continuum, dispersed along the horizontal axis and imaged onto a horizontal stripe of the sensor. The counts include shot noise, read noise and a dark offset and saturate at 255. Frames take as long as on a real camera, i.e. exposure time plus readout in single frame mode and the frame period during continuous capture. With a hardware trigger, frames are taken on the pulses of a simulated TTL signal with :py:attr:`SimulatedCamera.trigger_rate`.
+
+..
+   This file is part of the uc480 python module.
+
+   The uc480 python module is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   The uc480 python module is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with the uc480 python module. If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2015 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import time
+import math
+import numpy as np
+
+from . import uc480, uc480Error, _binning_modes, _subsampling_modes, _trigger_modes
+from . import TRIGGER_OFF, TRIGGER_RISING, TRIGGER_FALLING, TRIGGER_SOFTWARE
+from .uc480_h import IS_NO_SUCCESS, IS_INVALID_PARAMETER, IS_SEQUENCE_LIST_EMPTY, IS_TIMED_OUT
+
+# emission lines of a Hg / Ar lamp (wavelength in nm, relative intensity)
+LINES = [(404.7, 0.35), (435.8, 0.8), (546.1, 1.0), (577.0, 0.3), (579.1, 0.3),
+         (696.5, 0.25), (706.7, 0.2), (738.4, 0.2), (750.4, 0.45), (763.5, 0.6)]
+
+
+class SimulatedCamera(uc480):
+    """Simulated uc480 camera.
+    """
+    def __init__(self, width = 1280, height = 1024, rgb = False, serial = "SIM00001", realtime = True, seed = None, pool = 0):
+        """Constructor.
+
+        :param int width: Sensor width in pixels.
+        :param int height: Sensor height in pixels.
+        :param bool rgb: Simulate a color sensor (RGB24 frames) instead of a monochrome one (mono8).
+        :param str serial: Serial number.
+        :param bool realtime: If True, frames take as long as on a real camera. If False, they are returned as fast as they can be generated.
+        :param int seed: Seed of the random number generator for reproducible noise.
+        :param int pool: If > 0, only this number of frames is generated for the current settings and then replayed, so that the time for generating the noise does not show up in benchmarks.
+        """
+        self._lib = None
+        self._cam_list = []
+        self._camID = None
+        self._deviceID = None
+        self._serial = serial
+        self._swidth = int(width)
+        self._sheight = int(height)
+        self._width = 0
+        self._height = 0
+        self._rgb = rgb
+        self._rows = None
+
+        self._image = None
+        self._imgID = None
+        self._imageview = None
+
+        self._seq = None
+        self._seqview = None
+        self._seqlast = -1
+        self._seqlocked = None
+        self._lastframe = None
+        self._dropped = 0
+        self._trigger = TRIGGER_OFF
+        self._trigdelay = 0
+        self._trigtimeout = 1000
+        self._trigcount = 0
+        self._trigmissed = 0
+        self._swtriggers = 0
+        self.timer = None
+
+        # simulated hardware state
+        self.realtime = realtime
+        self._rng = np.random.RandomState(seed)
+        self._aoi = (0, 0, self._swidth, self._sheight)
+        self._binning = (1, 1)
+        self._subsampling = (1, 1)
+        self._gain = 0
+        self._exposure = 1.0
+        self._connected = False
+        self._tnext = None
+        self._model = None
+        self.pool = pool
+        self._pool = []
+        self._poolindex = 0
+
+        # optical and electrical parameters
+        self.wlrange = (800.0, 400.0)     # wavelength at the left and right edge of the sensor in nm
+        self.linewidth = 1.5              # FWHM of the emission lines in nm
+        self.stripe = (0.55, 6.0)         # vertical position (fraction of the sensor height) and rms width (px) of the spectral stripe
+        self.brightness = 20.0            # photoelectrons per ms at the brightest pixel
+        self.darkcurrent = 0.01           # electrons per ms and pixel
+        self.offset = 2.0                 # black level in counts
+        self.readnoise = 1.5              # read noise in counts
+        self.rowtime = 0.039              # readout time per row in ms, i.e. 25 fps at full sensor height
+        self.trigger_rate = 100.0         # repetition rate of the TTL signal at the trigger input in Hz (0 = no signal)
+
+    # there is no library behind this class; any call that is not simulated is an error
+    def call(self, function, *args):
+        raise uc480Error(IS_NO_SUCCESS, "Error: %s is not simulated!" % function, function)
+
+    def query(self, function, *args):
+        raise uc480Error(IS_NO_SUCCESS, "Error: %s is not simulated!" % function, function)
+
+    def connect_to_library(self, library = None):
+        pass
+
+    def get_cameras(self):
+        print("Found 1 camera(s)")
+        print("Camera #0: SerNo = %s, CameraID = 1, DeviceID = 1 (simulated)" % self._serial)
+        return self.cameras()
+
+    def cameras(self):
+        return [(self._serial, 1, 1)]
+
+    def connect(self, cameraID = 0, deviceID = None):
+        """Connect to the simulated camera and reset it to the default parameters.
+
+        :param int cameraID: Ignored.
+        :param int deviceID: If not None, the serial number is set to *SIM* followed by the device ID, so that several simulated cameras can be told apart.
+        """
+        self._camID = 1
+        self._deviceID = 1
+        if deviceID is not None:
+            self._deviceID = int(deviceID)
+            self._serial = "SIM%05d" % self._deviceID
+        self._bitsperpixel = 24 if self._rgb else 8
+        self.expmin, self.expmax, self.expinc = 0.05, 1000.0, 0.05
+        self._binning = (1, 1)
+        self._subsampling = (1, 1)
+        self._gain = 0
+        self._exposure = self.expmin
+        self._trigger = TRIGGER_OFF
+        self._connected = True
+        print("Sensor: %d x %d pixels, RGB = %d, %d bits/px (simulated)" % (self._swidth, self._sheight, self._rgb, self._bitsperpixel))
+        self.reset_aoi()
+
+    def disconnect(self):
+        """Disconnect the simulated camera.
+        """
+        if self._seq is not None:
+            self.stop_capture()
+        self._connected = False
+
+    def get_temperature(self):
+        """Returns the simulated camera temperature in deg C, which drifts slowly around 35 deg C.
+        """
+        return 35.0 + 0.5 * np.sin(time.time() / 600.0)
+
+    def wavelengths(self):
+        """Returns the wavelength of each column of the current image in nm.
+        """
+        x, _ = self._sensor_coordinates()
+        return self.wlrange[0] + (self.wlrange[1] - self.wlrange[0]) * x / float(self._swidth)
+
+    # ##########################################################################################################
+    # area of interest, binning and subsampling
+    def set_aoi(self, x, y, width, height):
+        x, y, width, height = int(x), int(y), int(width), int(height)
+        mwidth, mheight = self._max_size()
+        if x < 0 or y < 0 or width < 1 or height < 1 or x + width > mwidth or y + height > mheight:
+            raise uc480Error(IS_INVALID_PARAMETER, "Error: invalid AOI %d, %d, %d x %d!" % (x, y, width, height), "set_aoi")
+        self._aoi = (x, y, width, height)
+        self._update_image_size()
+
+    def get_aoi(self):
+        return self._aoi
+
+    def reset_aoi(self):
+        mwidth, mheight = self._max_size()
+        self.set_aoi(0, 0, mwidth, mheight)
+
+    def set_binning(self, vertical = 1, horizontal = 1):
+        self._factor_to_mode(_binning_modes, vertical, horizontal, "set_binning")
+        self._binning = (int(vertical), int(horizontal))
+        self.reset_aoi()
+
+    def get_binning(self):
+        return self._binning
+
+    def set_subsampling(self, vertical = 1, horizontal = 1):
+        self._factor_to_mode(_subsampling_modes, vertical, horizontal, "set_subsampling")
+        self._subsampling = (int(vertical), int(horizontal))
+        self.reset_aoi()
+
+    def get_subsampling(self):
+        return self._subsampling
+
+    # image size for an AOI covering the full sensor
+    def _max_size(self):
+        fy = self._binning[0] * self._subsampling[0]
+        fx = self._binning[1] * self._subsampling[1]
+        return self._swidth // fx, self._sheight // fy
+
+    # sensor coordinates of the centers of the image columns and rows
+    def _sensor_coordinates(self):
+        x, y, width, height = self._aoi
+        fy = self._binning[0] * self._subsampling[0]
+        fx = self._binning[1] * self._subsampling[1]
+        return (x + np.arange(width)) * fx + 0.5 * (fx - 1), (y + np.arange(height)) * fy + 0.5 * (fy - 1)
+
+    def set_roi(self, y, height, hardware = True):
+        if hardware:
+            x, y0, width, _ = self.get_aoi()
+            _, ymax = self._max_size()
+            ystart = min(max(0, y0 + int(y)), ymax - 1)
+            height = min(max(1, int(height)), ymax - ystart)
+            self._rows = None
+            self.set_aoi(x, ystart, width, height)
+        else:
+            uc480.set_roi(self, y, height, hardware)
+
+    # ##########################################################################################################
+    # gain and exposure
+    def set_gain(self, gain):
+        self._gain = max(0, min(int(gain), 100))
+
+    def get_gain(self):
+        return self._gain
+
+    def set_gain_boost(self, onoff):
+        pass
+
+    def set_blacklevel(self, blck):
+        pass
+
+    def set_exposure(self, exp):
+        exp = min(max(float(exp), self.expmin), self.expmax)
+        self._exposure = self.expmin + round((exp - self.expmin) / self.expinc) * self.expinc
+
+    def get_exposure(self):
+        return self._exposure
+
+    # ##########################################################################################################
+    # frame generation
+    # photoelectrons per ms for every pixel of the current image
+    def _photon_rate(self):
+        x, y = self._sensor_coordinates()
+        wl = self.wlrange[0] + (self.wlrange[1] - self.wlrange[0]) * x / float(self._swidth)
+
+        spectrum = 0.3 * np.exp(-((wl - 600.0) / 150.0)**2)
+        sigma = self.linewidth / 2.355
+        for center, intensity in LINES:
+            spectrum += intensity * np.exp(-0.5 * ((wl - center) / sigma)**2)
+
+        stripe = np.exp(-0.5 * ((y - self.stripe[0] * self._sheight) / self.stripe[1])**2)
+        rate = self.brightness * np.outer(stripe, spectrum) * (self._binning[0] * self._binning[1])
+        if self._rgb:
+            response = [np.exp(-((wl - c) / 60.0)**2) for c in (610.0, 540.0, 460.0)]
+            rate = rate[:, :, np.newaxis] * np.dstack(response)
+        return rate
+
+    # mean counts and noise for the current settings; cached until the settings change
+    def _frame_model(self):
+        key = (self._aoi, self._binning, self._subsampling, self._exposure, self._gain)
+        if self._model is None or self._model[0] != key:
+            gainf = 1.0 + 9.0 * self._gain / 100.0
+            electrons = self._photon_rate() * self._exposure + self.darkcurrent * self._exposure
+            mean = self.offset + electrons * gainf + 0.5     # + 0.5 for rounding by truncation
+            std = np.sqrt(electrons * gainf**2 + self.readnoise**2)
+            self._model = (key, mean, std)
+            self._pool = []
+        return self._model[1], self._model[2]
+
+    # generate a new frame into the image buffer
+    def _generate(self):
+        mean, std = self._frame_model()
+        if self.pool > 0 and len(self._pool) == self.pool:
+            self._poolindex = (self._poolindex + 1) % self.pool
+            self._imageview[...] = self._pool[self._poolindex]
+            return self._imageview
+
+        frame = self._rng.standard_normal(mean.shape)
+        frame *= std
+        frame += mean
+        np.clip(frame, 0, 255, out=frame)
+        self._imageview[...] = frame
+        if self.pool > 0:
+            self._pool.append(self._imageview.copy())
+        return self._imageview
+
+    # time between two frames in ms
+    def _frame_period(self):
+        period = max(self._exposure, self._height * self.rowtime)
+        if self._hardware_trigger() and self.trigger_rate > 0:
+            # the camera takes a frame on the first pulse after it is ready again; the pulses in between are missed
+            pulse = 1000.0 / self.trigger_rate
+            period = math.ceil(period / pulse - 1e-9) * pulse
+        return period
+
+    def _hardware_trigger(self):
+        return self._trigger in (TRIGGER_RISING, TRIGGER_FALLING)
+
+    # raise a timeout if no trigger arrives, i.e. there is no TTL signal or no software trigger was sent during capture
+    def _check_trigger(self, timeout, fname):
+        if self._hardware_trigger():
+            ok = self.trigger_rate > 0 and 1000.0 / self.trigger_rate <= self._trigtimeout
+        else:
+            ok = self._trigger != TRIGGER_SOFTWARE or self._seq is None or self._swtriggers > 0
+        if not ok:
+            self._sleep_until(time.time() + timeout / 1000.0)
+            raise uc480Error(IS_TIMED_OUT, "Error: no trigger received within %d ms!" % timeout, fname)
+        if self._trigger == TRIGGER_SOFTWARE and self._seq is not None:
+            self._swtriggers -= 1
+
+    def _sleep_until(self, t):
+        if self.realtime:
+            dt = t - time.time()
+            if dt > 0:
+                time.sleep(dt)
+
+    # ##########################################################################################################
+    # image buffers and capture
+    def _update_image_size(self):
+        nbuffers = len(self._seq) if self._seq is not None else 0
+        if nbuffers:
+            self.stop_capture()
+
+        _, _, self._width, self._height = self.get_aoi()
+        self._rows = None
+        self._model = None
+        self.create_buffer()
+
+        if nbuffers:
+            self.start_capture(nbuffers)
+
+    def create_buffer(self):
+        shape = (self._height, self._width, 3) if self._rgb else (self._height, self._width)
+        self._imageview = np.zeros(shape, dtype=np.uint8)
+        self._image = True
+
+    def get_buffer(self, copy = True):
+        if not copy:
+            return self._imageview
+        return self._imageview.copy()
+
+    # ##########################################################################################################
+    # trigger
+    def set_trigger(self, edge = TRIGGER_RISING, delay = 0, timeout = 1000):
+        if edge not in _trigger_modes:
+            raise uc480Error(IS_INVALID_PARAMETER, "Error: unknown trigger mode %s!" % edge, "set_trigger")
+        nbuffers = len(self._seq) if self._seq is not None else 0
+        if nbuffers:
+            self.stop_capture()
+        self._trigger = edge
+        self._trigdelay = int(round(delay))
+        self._trigtimeout = timeout
+        self._swtriggers = 0
+        if nbuffers:
+            self.start_capture(nbuffers)
+
+    def get_trigger(self):
+        return self._trigger, self._trigdelay, self._trigtimeout
+
+    def get_trigger_delay_limits(self):
+        return 0, 4000000, 1
+
+    def force_trigger(self):
+        self._swtriggers += 1
+
+    def get_trigger_counters(self):
+        return self._trigcount, self._trigmissed
+
+    def start_capture(self, nbuffers = 8):
+        if self._seq is not None:
+            self.stop_capture()
+        self._seq = [None] * max(2, int(nbuffers))
+        self._seqlast = -1
+        self._dropped = 0
+        self._tnext = time.time() + self._frame_period() / 1000.0
+        if self._hardware_trigger():
+            self._tnext += self._trigdelay / 1e6
+
+    def stop_capture(self):
+        if self._seq is None:
+            return
+        self._seq = None
+        if self._dropped > 0:
+            print("WARNING: %d frame(s) were dropped during continuous capture.." % self._dropped)
+
+    def release_frame(self):
+        pass
+
+    def get_frame(self, timeout = None, copy = True):
+        if self._seq is None:
+            raise uc480Error(IS_SEQUENCE_LIST_EMPTY, "Error: continuous capture is not running!", "get_frame")
+        if timeout is None:
+            timeout = self._frame_timeout()
+        self._check_trigger(timeout, "get_frame")
+        period = self._frame_period() / 1000.0
+        if self.realtime and self._tnext - time.time() > timeout / 1000.0:
+            raise uc480Error(IS_TIMED_OUT, "Error: no frame received within %d ms!" % timeout, "get_frame")
+
+        # frames that were overwritten in the ring buffer while nobody was reading
+        if self.realtime:
+            lost = int((time.time() - self._tnext) / period) - len(self._seq) + 1
+            if lost > 0:
+                self._dropped += lost
+                self._tnext += lost * period
+                print("WARNING: %d frame(s) dropped in continuous capture (%d in total).." % (lost, self._dropped))
+
+        frame = self._generate()
+        self._sleep_until(self._tnext)
+        self._tnext = max(self._tnext, time.time() - period * len(self._seq)) + period
+        self._seqlast = (self._seqlast + 1) % len(self._seq)
+        if self._hardware_trigger():
+            pulses = int(round(period * self.trigger_rate))
+            self._trigcount += pulses
+            self._trigmissed += pulses - 1
+        return frame if not copy else frame.copy()
+
+    # single frame mode: exposure and readout start with the request or the next trigger pulse
+    def _freeze_frame(self):
+        tstart = time.time()
+        if self._hardware_trigger():
+            self._check_trigger(self._trigtimeout, "is_FreezeVideo")
+            pulse = 1.0 / self.trigger_rate
+            tstart = math.ceil(tstart / pulse) * pulse + self._trigdelay / 1e6
+            self._trigcount += 1
+        tdone = tstart + (self._exposure + self._height * self.rowtime) / 1000.0
+        self._generate()
+        self._sleep_until(tdone)
@@ -29,7 +29,7 @@ import ctypes
 if platform.system() == "Windows":
     import ctypes.wintypes as wt
 else:
-    import wintypes_linux as wt
+    from . import wintypes_linux as wt
 
 #  ----------------------------------------------------------------------------
 #  Color modes
@@ -28,31 +28,16 @@ import time
 import numpy as np
 import wx.lib.plot as plot
 
-# ---------------------------------------------------------------------------
-# import camera driver
-try:
-    import drivers.uc480 as cam
-    cam480 = cam.uc480()
-    cam480.connect()    # see whether we can connect
-    sensor_width, _ = cam480.get_sensor_size()
-    cam480.close()
-    uc480avail = True
-except:
-    sensor_width = 1024  # some default
-    uc480avail = False
-
-# import seabreeze module
-try:
-    import seabreeze
-    seabreeze.use('pyseabreeze')
-    import seabreeze.spectrometers as sb
-    if len(sb.list_devices()) == 0:    # count connected OOs
-        raise
-    sensor_active_pixels = (1, -1)
-    OOavail = True
-except:
-    OOavail = False
-# ---------------------------------------------------------------------------
+import drivers.backends as backends
+from uvvis.acquisition import AcquisitionController, LIVE_LAST, LIVE_BOXCAR, LIVE_EMA
+from uvvis.discovery import discover
+from uvvis.display import decimate
+from uvvis.exposure import AutoExposure, ExposureControl
+from uvvis.dark import DarkLibrary
+from uvvis import hdr
+from uvvis import fileio
+from uvvis.recorder import SpectrumRecorder
+from uvvis.timing import StageTimer
 
 
 # main class
@@ -63,8 +48,7 @@ class pyUVVIS(wx.Frame):
         super(pyUVVIS, self).__init__(parent, title=title, style=wx.DEFAULT_FRAME_STYLE | wx.MAXIMIZE)
 
         # camera handle
-        self.cam = None        # camera handle
-        self.activeCam = None  # type of camera = "uc480" or "OO"
+        self.cam = None        # input device backend, see drivers.backends
 
         # default camera and acquisition parameters
         self.gain = 0          # gain
@@ -79,30 +63,33 @@ class pyUVVIS(wx.Frame):
         self.avgmin = 1
         self.avgmax = 1000
         self.avginc = 1
-        self.cAvg = 0
 
-        # measurement mode of program
-        self.recording = False
-        self.modeUVVIS = False        # False = spectrum, True = UVVIS
-        self.running = False
-        self.ok_to_overwrite = False
-
-        # current data
-        self.data = None              # current dataset
-        self.reference = None         # reference for UVVIS mode
-        self.dark = None              # dark background spectrum
+        # measurement mode, current data, reference and dark spectra are held by the acquisition controller,
+        # which reads and processes the spectra in a background thread
+        self.acq = AcquisitionController(self.readCamera, lambda: wx.CallAfter(self.OnUpdate))
+        self.acq.avg = self.avg
+        self.liveModes = [LIVE_LAST, LIVE_BOXCAR, LIVE_EMA]     # averaging modes for live view, cycled by right click on start
+        self.liveLabels = {LIVE_LAST: "no averaging", LIVE_BOXCAR: "moving average", LIVE_EMA: "exponential average"}
 
         # light level
         self.levelwasok = True
         self.satlevel = 1.0
-
-        # get wavelength axis
-        self.wlAxis = self.getWlAxis()
-
-        # try to connect to camera
-        self.connectCamera()
-        self.updThread = wx.Timer(self)
-        self.Bind(wx.EVT_TIMER, self.OnUpdate, self.updThread)
+        self.expControl = None        # closed-loop exposure control during live view
+        self.autoExpOn = False
+        self.hdr = None               # exposure bracketing, see uvvis.hdr
+
+        # dark spectra by device, settings and temperature; the matching one is subtracted from every frame
+        self.darks = DarkLibrary(os.path.abspath("darks.npz"))
+        self.darkOn = False
+        self.darkMissing = False
+        self.darkState = None     # how the dark spectrum of the last frame was obtained, see DarkLibrary.state
+        self.camTemp = None           # detector temperature, updated every 10s
+        self.camTempTime = 0
+        self.frameExp = None          # exposure time and gain of the last frame as reported by the input device
+        self.frameGain = None
+
+        # wavelength axis; provided by the input device if calibrated
+        self.wlAxis = None
 
         # some plotting stuff
         # list of colors for the plots
@@ -111,7 +98,17 @@ class pyUVVIS(wx.Frame):
                        wx.Colour(0, 200, 0), wx.Colour(0, 255, 128),
                        wx.Colour(0, 255, 255), wx.Colour(0, 128, 255),
                        wx.Colour(0, 0, 255)]
-        self.lines = []               # list of lines to display
+        self.lines = []               # list of lines to display; each entry holds the line and its error band
+        self.linedata = []            # full resolution data, color and standard errors of the lines
+        self.showErrors = True        # show the standard error of averaged spectra as band
+        self.maxfps = 30              # maximum refresh rate of the plot window
+        self.lastDraw = 0             # time of last redraw
+        self.drawPending = None       # deferred redraw
+        self.quitting = False         # events queued before the window was destroyed are ignored
+
+        # timing of the measurement loop from the camera wait to the plot redraw; shown in the status bar
+        self.timer = StageTimer()
+        self.acq.timer = self.timer
 
         # build the main GUI
         self.createUI()
@@ -119,11 +116,15 @@ class pyUVVIS(wx.Frame):
         # display myself
         self.Show()
 
+        # look for connected input devices in the background and connect when done
+        discover(lambda names: wx.CallAfter(self.OnDevicesFound, names))
+
     # --------------------------------------------------------------------------
     # GUI creation stuff
     def createUI(self):
         self.createTB()
         self.createPlotWnd()
+        self.createStatusBar()
         self.Fit()
 
     def createTB(self):
@@ -133,7 +134,7 @@ class pyUVVIS(wx.Frame):
 
         tbsave = tb.AddLabelTool(wx.ID_ANY, "Save Spectrum", wx.Bitmap('icons/10_7.png'), shortHelp="Save current spectrum.")
         tbload = tb.AddLabelTool(wx.ID_ANY, "Load Spectrum", wx.Bitmap('icons/11_5.png'), shortHelp="Load spectrum as overlay.")
-        tbdelete = tb.AddLabelTool(wx.ID_ANY, "Remove Spectrum", wx.Bitmap('icons/11_4.png'), shortHelp="Remove spectrum.")
+        tbdelete = tb.AddLabelTool(wx.ID_ANY, "Remove Spectrum", wx.Bitmap('icons/11_4.png'), shortHelp="Remove spectrum (right click: show / hide error bands).")
         tb.AddSeparator()
         tb.AddControl(wx.StaticText(tb, label="Averages", size=(90, -1)))
         tbavgdec = tb.AddLabelTool(wx.ID_ANY, "Reduce Averages", wx.Bitmap('icons/8_7.png'), shortHelp="Reduce numer of averages.")
@@ -162,19 +163,22 @@ class pyUVVIS(wx.Frame):
         self.tbstart2BMP = wx.Bitmap('icons/15_6.png')
         self.tbstart = wx.BitmapButton(tb, wx.ID_ANY, self.tbstart1BMP, style=wx.NO_BORDER)
         tb.AddControl(self.tbstart)
+        self.updateStartTip()
         self.tbrecord = tb.AddLabelTool(wx.ID_ANY, "Record", wx.Bitmap('icons/4_6.png'), shortHelp="Start recording.")
         self.tbmode1BMP = wx.Bitmap('icons/3_6.png')
         self.tbmode2BMP = wx.Bitmap('icons/3_4.png')
         self.tbmode = wx.BitmapButton(tb, wx.ID_ANY, self.tbmode1BMP, style=wx.NO_BORDER)
+        self.tbmode.SetToolTipString("Switch between counts and OD (right click: HDR exposure bracketing on / off).")
         tb.AddControl(self.tbmode)
         tb.AddSeparator()
         self.tblightlevel1BMP = wx.Bitmap('icons/levelok.png')
         self.tblightlevel2BMP = wx.Bitmap('icons/levelbad.png')
         self.tblightlevel = wx.StaticBitmap(tb, wx.ID_ANY, self.tblightlevel1BMP)
+        self.tblightlevel.SetToolTipString("Light level (click to switch continuous auto exposure on / off).")
         tb.AddControl(self.tblightlevel)
         tb.AddSeparator()
         tbauto = tb.AddLabelTool(wx.ID_ANY, "Auto Gain / Exposure", wx.Bitmap('icons/1_11.png'), shortHelp="Set auto gain / exposure.")
-        tbdark = tb.AddLabelTool(wx.ID_ANY, "Dark Signal Subtraction", wx.Bitmap('icons/1_9.png'), shortHelp="Subtract dark pattern.")
+        tbdark = tb.AddLabelTool(wx.ID_ANY, "Dark Signal Subtraction", wx.Bitmap('icons/1_9.png'), shortHelp="Subtract dark pattern (right click: take new dark spectrum).")
         tbquit = tb.AddLabelTool(wx.ID_ANY, "Quit", wx.Bitmap('icons/1_8.png'), shortHelp="Close pyUVVIS.")
 
         # finalize TB
@@ -185,6 +189,7 @@ class pyUVVIS(wx.Frame):
         self.Bind(wx.EVT_TOOL, self.OnTBSave, tbsave)
         self.Bind(wx.EVT_TOOL, self.OnTBLoad, tbload)
         self.Bind(wx.EVT_TOOL, self.OnTBDelete, tbdelete)
+        self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBDelete, tbdelete)
 
         self.Bind(wx.EVT_TOOL, self.OnTBAvgInc, tbavginc)
         self.Bind(wx.EVT_TOOL, self.OnTBAvgDec, tbavgdec)
@@ -203,16 +208,34 @@ class pyUVVIS(wx.Frame):
             self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBExpInc, tbexpinc)
             self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBExpDec, tbexpdec)
 
+        self.tblightlevel.Bind(wx.EVT_LEFT_DOWN, self.OnTBLightLevel)
         self.Bind(wx.EVT_TOOL, self.OnTBAuto, tbauto)
+        self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBAuto, tbauto)
         self.Bind(wx.EVT_BUTTON, self.OnTBStart, self.tbstart)
+        self.tbstart.Bind(wx.EVT_RIGHT_DOWN, self.OnRTBStart)
         self.Bind(wx.EVT_TOOL, self.OnTBRecord, self.tbrecord)
+        self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBRecord, self.tbrecord)
         self.Bind(wx.EVT_BUTTON, self.OnTBMode, self.tbmode)
+        self.tbmode.Bind(wx.EVT_RIGHT_DOWN, self.OnRTBMode)
         self.Bind(wx.EVT_TOOL, self.OnQuit, tbquit)
         self.Bind(wx.EVT_TOOL, self.OnTBDark, tbdark)
+        self.Bind(wx.EVT_TOOL_RCLICKED, self.OnRTBDark, tbdark)
 
         # bind the app exit event to an event handler so we can check whether there are some experiments running and shut down all the modules properly
         self.Bind(wx.EVT_CLOSE, self.OnQuit)
 
+    # achieved frame rate and mean duration of every stage; right click exports the recorded stages as trace file
+    def createStatusBar(self):
+        self.statusBar = self.CreateStatusBar()
+        self.statusBar.SetToolTipString("Frame rate, time per stage and source of the dark spectrum (right click: save trace).")
+        self.statusBar.Bind(wx.EVT_RIGHT_DOWN, self.OnRSBTrace)
+        self.statusTimer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.OnStatusTimer, self.statusTimer)
+        self.statusTimer.Start(500)
+
+    def updateStartTip(self):
+        self.tbstart.SetToolTipString("Start / stop live view (%s, right click to change)." % self.liveLabels[self.acq.liveMode])
+
     def createPlotWnd(self):
         self.plotWnd = plot.PlotCanvas(self)
         self.plotWnd.SetEnableZoom(False)
@@ -220,196 +243,295 @@ class pyUVVIS(wx.Frame):
         self.plotWnd.SetEnableTitle(False)
         self.plotWnd.SetXSpec('min')
         self.plotWnd.SetFontSizeAxis(18)
+        self.plotWnd.Bind(wx.EVT_SIZE, self.OnPlotSize)
         self.addLine([0, 1], [0, 0])
 
     # --------------------------------------------------------------------------
     # camera interaction
-    def connectCamera(self):
-        if uc480avail and OOavail:
-            dlg = wx.SingleChoiceDialog(None, 'Please select input device..', 'Camera setup', ['uc480', 'OceanOptics'], style=wx.OK)
+    def connectCamera(self, names):
+        if len(names) > 1:
+            labels = [backends.get_backend(name).label for name in names]
+            dlg = wx.SingleChoiceDialog(None, 'Please select input device..', 'Camera setup', labels, style=wx.OK)
             dlg.ShowModal()
-            if dlg.GetSelection() == 0:
-                self.connectUC480()
-            else:
-                self.connectOO()
+            name = names[dlg.GetSelection()]
             dlg.Destroy()
-        elif uc480avail:
-            self.connectUC480()
-        elif OOavail:
-            self.connectOO()
+        elif len(names) == 1:
+            name = names[0]
         else:
             wx.MessageBox('No input device detected! Please check connections..', 'Camera setup', style=wx.OK | wx.ICON_EXCLAMATION)
+            name = backends.SimulatedBackend.name
+
+        # several devices of the selected type: one of them is used
+        cls = backends.get_backend(name)
+        devices = [None] if cls.simulated else cls.devices()
+        device = devices[0] if devices else None
+        if len(devices) > 1:
+            dlg = wx.SingleChoiceDialog(None, 'Please select %s device..' % cls.label, 'Camera setup', [str(d) for d in devices], style=wx.OK)
+            dlg.ShowModal()
+            device = devices[dlg.GetSelection()]
+            dlg.Destroy()
 
-    def connectUC480(self):
-        self.cam = cam.uc480()
+        self.cam = cls(device)
         self.cam.connect()
+        self.cam.set_timer(self.timer)
 
-        self.gain = self.cam.get_gain()
-        self.gainmin, self.gainmax, self.gaininc = self.cam.get_gain_limits()
-        self.exp = self.cam.get_exposure()
-        self.expmin, self.expmax, self.expinc = self.cam.get_exposure_limits()
-
-        self.activeCam = 'uc480'
-
-    def connectOO(self):
-        devices = sb.list_devices()
-        self.cam = sb.Spectrometer(devices[0])
-
-        self.exp = self.cam.minimum_integration_time_micros / 1000 + 1.0
-        self.cam.integration_time_micros(self.exp * 1000)
-        self.expmin, self.expmax, self.expinc = self.exp, 65000, 2
-        self.satlevel = self.cam._dev.interface._MAX_PIXEL_VALUE
-
-        self.wlAxis = self.cam.wavelengths()[sensor_active_pixels[0]:sensor_active_pixels[1]]
-        self.activeCam = 'OO'
+        if self.camSupportsGain():
+            self.gain = self.cam.get_gain()
+            self.gainmin, self.gainmax, self.gaininc = self.cam.get_gain_limits()
+        if self.camSupportsExp():
+            self.exp = self.cam.get_exposure()
+            self.expmin, self.expmax, self.expinc = self.cam.get_exposure_limits()
+        self.satlevel = self.cam.satlevel
+        self.wlAxis = self.cam.wavelengths()
+        self.expControl = ExposureControl(self.cam, reset=self.acq.reset_live, dark=self.lookupDark)
 
     def camClose(self):
-        if self.activeCam == 'uc480':
-            self.cam.disconnect()
-        elif self.activeCam == 'OO':
+        if self.cam is not None:
             self.cam.close()
 
     # read a frame from the active input device and check for overexposure
+    # with continuous auto exposure, the settings are adjusted between the frames and the spectra are in counts per ms
     def readCamera(self):
-        if self.activeCam == 'uc480':
-            data, _, mint = self.cam.acquireBinned(1)
-            data = np.flipud(data)
-            ovexp = mint >= 255
-
-        elif self.activeCam == 'OO':
-            data = self.cam.intensities()[sensor_active_pixels[0]:sensor_active_pixels[1]]
-            ovexp = np.amax(data) >= self.satlevel
+        if time.time() - self.camTempTime > 10:
+            self.camTemp = self.cam.get_temperature()
+            self.camTempTime = time.time()
+        if self.hdr is not None:
+            self.frameExp, self.frameGain = self.exp, self.gain
+            return self.hdr.read()
+        if self.autoExpOn:
+            self.frameExp, self.frameGain = self.expControl.exp, self.expControl.gain
+            return self.expControl.read()
+        self.frameExp, self.frameGain = self.cam.get_exposure(), self.cam.get_gain()
+        data, ovexp = self.cam.read()
+        if self.darkOn:
+            dark = self.lookupDark(self.frameExp, self.frameGain)
+            if dark is not None and len(dark) == len(data):
+                data = data - dark
+        return data, ovexp
 
+    # returns the dark spectrum for the given settings from the library or None if dark subtraction is off
+    def lookupDark(self, exp, gain):
+        if not self.darkOn:
+            return None
+        dark = self.darks.get(self.cam.dark_id(), exp, gain, self.camTemp)
+        if dark is None and not self.darkMissing:
+            print("WARNING: No dark spectrum for exposure time %g ms and gain %g.." % (exp, gain))
+        self.darkMissing = dark is None
+        self.darkState = self.darks.state
+        return dark
+
+    def setAutoExp(self, on):
+        if on:
+            self.setHDR(False)
+        self.autoExpOn = on
+        self.updateFloor()
+        self.acq.reset_live()
+
+    # exposure bracketing starting at the current exposure time; spectra are in counts per ms
+    def setHDR(self, on):
+        if self.hdr is not None:
+            self.hdr.close()
+            self.hdr = None
+        if on:
+            self.autoExpOn = False
+            self.hdr = hdr.HDRAcquisition(self.cam, hdr.bracket(self.exp, self.expmax), dark=self.lookupDark)
+        self.updateFloor()
+        self.acq.reset_live()
+
+    # minimum of the processed spectra: 1 count or 1 count in the longest exposure time for spectra in counts per ms
+    def updateFloor(self):
+        if self.hdr is not None:
+            self.acq.floor = self.hdr.floor
+        elif self.autoExpOn:
+            self.acq.floor = self.expControl.floor
         else:
-            data = (np.random.rand(64) + 1) * 10
-            ovexp = False
-
-        return data, ovexp
+            self.acq.floor = 1.0
 
     def camSupportsGain(self):
-        if self.activeCam == 'uc480':
-            return True
-        return False
+        return self.cam is not None and self.cam.supports(backends.CAP_GAIN)
 
     def camSupportsExp(self):
-        if self.activeCam in ['uc480', 'OO']:
-            return True
-        return False
+        return self.cam is not None and self.cam.supports(backends.CAP_EXPOSURE)
 
     def camSetGain(self, g):
-        if self.activeCam == 'uc480':
-            self.cam.set_gain(g)
+        if self.camSupportsGain():
+            self.acq.execute(self.cam.set_gain, g)
 
     def camSetExp(self, e):
-        if self.activeCam == 'uc480':
-            self.cam.set_exposure(e)
-        elif self.activeCam == 'OO':
-            self.cam.integration_time_micros(e * 1000.0)
-
-    def getWlAxis(self):
-        # get wavelength axis
-        # if uc480 is used and calibration file exists
-        wlAxis = None
-        if uc480avail:
-            if os.path.exists("calibration.dat"):
-                px, wl = np.loadtxt("calibration.dat", unpack=True)
-                n = float(len(px))
-                b = (n * np.sum(px * wl) - np.sum(px) * np.sum(wl)) / (n * np.sum(px**2) - np.sum(px)**2)
-                a = np.mean(wl) - b * np.mean(px)
-                wlAxis = a + np.arange(sensor_width) * b
-        return wlAxis
+        if self.camSupportsExp():
+            if self.hdr is not None:
+                self.acq.execute(self.setHDR, True)
+            else:
+                self.acq.execute(self.cam.set_exposure, e)
 
     # --------------------------------------------------------------------------
     # plotting stuff
 
-    # add line to plot window
-    def addLine(self, x, y, id=None):
-        # convert arrays to array of point tuples
-        data = np.swapaxes(np.vstack((x, y)), 0, 1)
-
+    # add line to plot window; err are the standard errors of y, which are shown as band around the line
+    def addLine(self, x, y, id=None, err=None):
         # get plot colors
         if id is not None:
             clr = self.colors[id % len(self.colors)]
         else:
             clr = self.colors[len(self.lines) % len(self.colors)]
 
-        # generate new line object
-        line = plot.PolyLine(data, width=2, colour=clr)
+        # generate new line object; overlays are decimated only once and then reused for every redraw
+        line = self.makeLine(x, y, clr, err)
 
         # add to line stack
         if id is None or len(self.lines) == 0:
             self.lines.append(line)
+            self.linedata.append((x, y, clr, err))
         else:
             self.lines[id] = line
+            self.linedata[id] = (x, y, clr, err)
 
         # replot
         self.refreshPlot()
 
-    # refresh the plot window
+    # create a line object decimated to the width of the plot window and, if errors are given, the lines of the error band
+    def makeLine(self, x, y, clr, err=None):
+        width = self.plotWnd.GetClientSize()[0]
+        line = [plot.PolyLine(decimate(x, y, width), width=2, colour=clr)]
+        if err is not None:
+            for sign in (-1, 1):
+                line.append(plot.PolyLine(decimate(x, y + sign * err, width), width=1, colour=clr, style=wx.DOT))
+        return line
+
+    # refresh the plot window; redraws are limited to maxfps, requests in between are merged into one deferred redraw
     def refreshPlot(self):
-        if self.modeUVVIS:
-            gc = plot.PlotGraphics(self.lines, '', 'Wavelength', 'OD')
+        dt = time.time() - self.lastDraw
+        if dt < 1.0 / self.maxfps:
+            if self.drawPending is None:
+                self.drawPending = wx.CallLater(int((1.0 / self.maxfps - dt) * 1000) + 1, self.drawPlot)
+            return
+        self.drawPlot()
+
+    def drawPlot(self):
+        self.drawPending = None
+        self.lastDraw = time.time()
+        t0 = self.timer.now()
+
+        if self.showErrors:
+            lines = [obj for line in self.lines for obj in line]
+        else:
+            lines = [line[0] for line in self.lines]
+
+        if self.acq.modeUVVIS:
+            gc = plot.PlotGraphics(lines, '', 'Wavelength', 'OD')
+        elif self.autoExpOn or self.hdr is not None:
+            gc = plot.PlotGraphics(lines, '', 'Wavelength', 'Counts / ms')
         else:
-            gc = plot.PlotGraphics(self.lines, '', 'Wavelength', 'Counts')
+            gc = plot.PlotGraphics(lines, '', 'Wavelength', 'Counts')
 
         self.plotWnd.Draw(gc)
+        self.timer.record("draw", t0, self.timer.now())
+
+    # re-decimate all lines when the width of the plot window changes
+    def OnPlotSize(self, event):
+        event.Skip()
+        self.lines = [self.makeLine(x, y, clr, err) for x, y, clr, err in self.linedata]
+        self.refreshPlot()
 
     # -------------------------------------------------------------------------------------------------------------------
     # events
 
+    # device discovery has finished: connect to the device and rebuild the toolbar for its capabilities
+    def OnDevicesFound(self, names):
+        if self.quitting:
+            return
+        self.connectCamera(names)
+
+        tb = self.GetToolBar()
+        if tb is not None:
+            self.SetToolBar(None)
+            tb.Destroy()
+        self.createTB()
+        self.Layout()
+
     def OnQuit(self, event):
-        self.updThread.Stop()
-        time.sleep(0.5)
+        self.quitting = True
+        self.statusTimer.Stop()
+        self.acq.callback = None
+        self.acq.stop(wait=True)
+        if self.drawPending is not None:
+            self.drawPending.Stop()
+            self.drawPending = None
         self.camClose()
         self.Destroy()
 
+    def OnStatusTimer(self, event):
+        if not self.quitting and self.acq.running:
+            text = self.timer.summary()
+            if self.darkOn:
+                text += " | dark %s" % (self.darkState or "missing")
+            self.statusBar.SetStatusText(text)
+
+    def OnRSBTrace(self, event):
+        dlg = wx.FileDialog(None, "Save Trace", os.getcwd(), "trace.json", "Chrome trace (*.json)|*.json", wx.SAVE)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.timer.export_trace(dlg.GetPath())
+        dlg.Destroy()
+
     def OnTBSave(self, event):
-        if self.data is None:
+        if self.acq.data is None:
             wx.MessageBox('Please record a spectrum first!', 'Save Spectrum', wx.OK | wx.ICON_INFORMATION)
             return
-        if self.running:
+        if self.acq.running:
             rng = True
             self.OnTBStart()
         else:
             rng = False
 
-        dlg = wx.FileDialog(None, "Save Spectrum", os.getcwd(), "", "*.*", wx.SAVE)
+        wildcard = "Binary spectrum (*%s)|*%s|Text file (*.*)|*.*" % (fileio.EXTENSION, fileio.EXTENSION)
+        dlg = wx.FileDialog(None, "Save Spectrum", os.getcwd(), "", wildcard, wx.SAVE)
         if dlg.ShowModal() == wx.ID_OK:
             filename = dlg.GetPath()
+            if dlg.GetFilterIndex() == 0 and not filename.lower().endswith(fileio.EXTENSION):
+                filename = filename + fileio.EXTENSION
 
             # set new working directory
             directory = os.path.split(filename)
             if not os.path.isdir(filename):
                 os.chdir(directory[0])
 
-            # save file
-            np.savetxt(filename, np.transpose(np.array([self.wlAxis, self.data])))
+            # save file together with the standard errors of the average; acquisition settings are stored in binary files only
+            data = self.acq.data
+            err = self.acq.stderr()
+            fileio.save_spectrum(filename, self.wlAxis, data, errors=err,
+                                 exposure=self.exp, gain=self.gain, averages=max(1, self.acq.cAvg),
+                                 dark=self.darkOn, reference=self.acq.modeUVVIS and self.acq.reference is not None)
 
             # add to plot window
-            self.addLine(self.wlAxis, self.data)
+            self.addLine(self.wlAxis, data, err=err)
         dlg.Destroy()
 
         if rng:
             self.OnTBStart()
 
     def OnTBLoad(self, event):
-        if self.running:
+        if self.acq.running:
             rng = True
             self.OnTBStart()
         else:
             rng = False
 
-        dlg = wx.FileDialog(None, "Open Spectrum", os.getcwd(), "", "*.*", wx.OPEN)
+        wildcard = "All files (*.*)|*.*|Binary spectrum (*%s)|*%s" % (fileio.EXTENSION, fileio.EXTENSION)
+        dlg = wx.FileDialog(None, "Open Spectrum", os.getcwd(), "", wildcard, wx.OPEN)
         if dlg.ShowModal() == wx.ID_OK:
             filename = dlg.GetPath()
             # set new working directory
             directory = os.path.split(filename)
             if not os.path.isdir(filename):
                 os.chdir(directory[0])
-            # save file
-            tmpx, tmpy = np.loadtxt(filename, unpack=True)
+            # load file; binary or text format is detected automatically
+            tmpx, tmpy, meta = fileio.load_spectrum(filename)
+            tmperr = meta.get("errors")
+            if tmpy.ndim > 1:    # stack of spectra, show the last one
+                tmpy = tmpy[-1]
+                tmperr = None if tmperr is None else tmperr[-1]
             # add to plot window
-            self.addLine(tmpx, tmpy)
+            self.addLine(tmpx, tmpy, err=tmperr)
 
         dlg.Destroy()
 
@@ -420,17 +542,25 @@ class pyUVVIS(wx.Frame):
         # remove the last plot in the list
         if len(self.lines) > 1:
             self.lines.pop()
+            self.linedata.pop()
+        self.refreshPlot()
+
+    def OnRTBDelete(self, event):
+        # show / hide the error bands
+        self.showErrors = not self.showErrors
         self.refreshPlot()
 
     def OnTBAvgInc(self, event=None):
         if self.avg + self.avginc <= self.avgmax:
             self.avg = self.avg + self.avginc
             self.tbavg.SetLabel(str(self.avg))
+            self.acq.avg = self.avg
 
     def OnTBAvgDec(self, event=None):
         if self.avg - self.avginc >= self.avgmin:
             self.avg = self.avg - self.avginc
             self.tbavg.SetLabel(str(self.avg))
+            self.acq.avg = self.avg
 
     def OnTBGainInc(self, event=None):
         self.gain = min(self.gainmax, self.gain + self.gaininc)
@@ -455,10 +585,12 @@ class pyUVVIS(wx.Frame):
     def OnRTBAvgInc(self, event=None):
         self.avg = min(self.avgmax, self.avg + 10 * self.avginc)
         self.tbavg.SetLabel(str(self.avg))
+        self.acq.avg = self.avg
 
     def OnRTBAvgDec(self, event=None):
         self.avg = max(self.avgmin, self.avg - 10 * self.avginc)
         self.tbavg.SetLabel(str(self.avg))
+        self.acq.avg = self.avg
 
     def OnRTBGainInc(self, event=None):
         self.gain = min(self.gainmax, self.gain + 10 * self.gaininc)
@@ -480,88 +612,178 @@ class pyUVVIS(wx.Frame):
         self.tbexp.SetLabel("%.2f" % self.exp)
         self.camSetExp(self.exp)
 
-    def OnTBStart(self, event=None):
-        if self.running:
+    def OnTBStart(self, event=None, recording=False):
+        if self.cam is None:
+            return
+        if self.acq.running:
             self.tbstart.SetBitmapLabel(self.tbstart1BMP)
-            self.running = False
-            self.recording = False
-            self.updThread.Stop()
+            self.acq.stop()
         else:
             self.tbstart.SetBitmapLabel(self.tbstart2BMP)
-            self.running = True
-            self.ok_to_overwrite = True
-            self.cAvg = 0
-            self.data = None
-            self.OnUpdate()
+            self.timer.reset()
+            self.acq.start(recording)
+
+    # cycle through the averaging modes for live view; moving averages are taken over the number of averages
+    def OnRTBStart(self, event=None):
+        mode = self.liveModes[(self.liveModes.index(self.acq.liveMode) + 1) % len(self.liveModes)]
+        self.acq.set_live_mode(mode)
+        self.updateStartTip()
 
     def OnTBRecord(self, event=None):
-        if self.running:
+        if self.acq.running:
+            self.OnTBStart()
+        self.OnTBStart(recording=True)
+
+    # stream every spectrum to disk until acquisition is stopped
+    def OnRTBRecord(self, event=None):
+        if self.cam is None:
+            return
+        if self.acq.running:
             self.OnTBStart()
-        self.recording = True
-        self.OnTBStart()
+
+        wildcard = "Binary spectrum (*%s)|*%s" % (fileio.EXTENSION, fileio.EXTENSION)
+        dlg = wx.FileDialog(None, "Record Time Series", os.getcwd(), "", wildcard, wx.SAVE)
+        if dlg.ShowModal() == wx.ID_OK:
+            filename = dlg.GetPath()
+            if not filename.lower().endswith(fileio.EXTENSION):
+                filename = filename + fileio.EXTENSION
+            wlAxis = self.wlAxis
+            if wlAxis is None:
+                wlAxis = np.arange(self.cam.pixels())
+            recorder = SpectrumRecorder(filename, wlAxis, exposure=self.exp, gain=self.gain, averages=1,
+                                        dark=self.darkOn, reference=self.acq.modeUVVIS and self.acq.reference is not None)
+            self.tbstart.SetBitmapLabel(self.tbstart2BMP)
+            self.acq.start(recorder=recorder)
+        dlg.Destroy()
 
     def OnTBMode(self, event):
-        if self.modeUVVIS:
-            self.tbmode.SetBitmapLabel(self.tbmode1BMP)
-            self.reference = None
-            self.modeUVVIS = False
-        else:
-            self.tbmode.SetBitmapLabel(self.tbmode2BMP)
-            self.reference = self.data
-            self.modeUVVIS = True
+        with self.acq.lock:
+            if self.acq.modeUVVIS:
+                self.tbmode.SetBitmapLabel(self.tbmode1BMP)
+                self.acq.reference = None
+                self.acq.modeUVVIS = False
+            else:
+                self.tbmode.SetBitmapLabel(self.tbmode2BMP)
+                self.acq.reference = None if self.acq.data is None else self.acq.data.copy()
+                self.acq.modeUVVIS = True
+            self.acq.reset_live()
+
+    # switch exposure bracketing on / off
+    def OnRTBMode(self, event):
+        if not self.camSupportsExp():
+            return
+        self.acq.execute(self.setHDR, self.hdr is None)
 
     # auto exposure / gain settings
     def OnTBAuto(self, event):
         if self.cam is None:
             return
 
-        if self.running:
+        if self.acq.running:
             wx.MessageBox('Please pause acquisition first!', 'Acquisition in progress!', wx.OK | wx.ICON_INFORMATION)
             return
 
         msg = "Setting automatic exposure time / gain.. please wait.."
         busyDlg = wx.BusyInfo(msg)
         self.tb.Enable(False)
-        wx.GetApp().Yield()
-
-        _, ovexp = self.readCamera()
-        while not ovexp:
-            if self.camSupportsExp() and self.exp < self.expmax:
-                self.OnRTBExpInc()
-            elif self.camSupportsGain() and self.gain < self.gainmax:
-                self.OnRTBGainInc()
-            else:
-                break
-            _, ovexp = self.readCamera()
-            wx.GetApp().Yield()
-        while ovexp:
-            if self.camSupportsGain() and self.gain > self.gainmin:
-                self.OnRTBGainDec()
-            elif self.camSupportsExp() and self.exp > self.expmin:
-                self.OnRTBExpDec()
-            else:
-                break
-            _, ovexp = self.readCamera()
+        try:
             wx.GetApp().Yield()
 
+            # fill the detector to 80% of the saturation level; after pausing, the worker may still be reading the last spectrum,
+            # so wait for it to finish to run the call right away instead of deferring it
+            self.acq.wait()
+            exp, gain, _ = self.acq.execute(AutoExposure(self.cam, target=0.8).run)
+            if self.camSupportsExp():
+                self.exp = exp
+                self.tbexp.SetLabel("%.2f" % self.exp)
+            if self.camSupportsGain():
+                self.gain = gain
+                self.tbgain.SetLabel(str(self.gain))
+        finally:
+            busyDlg = None
+            self.tb.Enable(True)
+
+    # switch continuous auto exposure during live view on / off; dark and reference spectra have to be taken in the same mode
+    def OnTBLightLevel(self, event):
+        if self.expControl is None:
+            return
+        self.acq.execute(self.setAutoExp, not self.autoExpOn)
+
+    # locate the spectral stripe on the sensor and restrict the readout to it
+    def OnRTBAuto(self, event):
+        if self.cam is None or not self.cam.supports(backends.CAP_ROI):
+            return
+
+        if self.acq.running:
+            wx.MessageBox('Please pause acquisition first!', 'Acquisition in progress!', wx.OK | wx.ICON_INFORMATION)
+            return
+
+        busyDlg = wx.BusyInfo("Locating spectrum on the sensor.. please wait..")
+        wx.GetApp().Yield()
+        self.acq.wait()      # run the calibration right away instead of deferring it to the end of the current spectrum
+        y, height = self.acq.execute(self.cam.calibrate_roi)
         busyDlg = None
-        self.tb.Enable(True)
+        wx.MessageBox('Using sensor rows %d to %d.' % (y, y + height - 1), 'Spectral ROI', wx.OK | wx.ICON_INFORMATION)
 
+    # switch dark subtraction on / off; if there is no dark spectrum for the current settings, the current spectrum is used
     def OnTBDark(self, event):
-        if self.dark is not None:
-            self.dark = None
-        elif self.data is None:
-            wx.MessageBox('Please record a spectrum first!', 'Background Correction', wx.OK | wx.ICON_INFORMATION)
+        if self.cam is None:
+            return
+        if self.darkOn:
+            self.darkOn = False
+            self.acq.reset_live()
+        elif self.darks.get(self.cam.dark_id(), *self.frameSettings(), temperature=self.camTemp) is not None:
+            self.darkOn = True
+            self.acq.reset_live()
         else:
-            self.dark = self.data.copy()
+            self.storeDark()
+
+    # take the current spectrum as dark spectrum for the current settings
+    def OnRTBDark(self, event):
+        if self.cam is None:
+            return
+        if self.darkOn:
+            wx.MessageBox('Please switch off dark subtraction first!', 'Background Correction', wx.OK | wx.ICON_INFORMATION)
+            return
+        self.storeDark()
+
+    # exposure time and gain of the last frame
+    def frameSettings(self):
+        if self.frameExp is None:
+            return self.exp, self.gain
+        return self.frameExp, self.frameGain
+
+    def storeDark(self):
+        with self.acq.lock:
+            data = None if self.acq.data is None else self.acq.data.copy()
+        if data is None:
+            wx.MessageBox('Please record a spectrum first!', 'Background Correction', wx.OK | wx.ICON_INFORMATION)
+            return
+        exp, gain = self.frameSettings()
+        if self.autoExpOn or self.hdr is not None:    # counts per ms
+            data *= exp
+        self.darks.add(self.cam.dark_id(), exp, gain, data, self.camTemp)
+        self.darkOn = True
+        self.acq.reset_live()
 
     # --------------------------------------------------------------------------
     # this is the main measurement routine where all the magic happens
+    # spectra are read and processed by the acquisition controller in a background thread; here, only the newest result is displayed
     def OnUpdate(self, event=None):
-        # read data from camera
-        # if self.cam is None:
-        #   return
-        data, ovexp = self.readCamera()
+        if self.quitting:
+            return
+        result = self.acq.get_latest()
+
+        # reading the input device failed; the acquisition has stopped
+        if self.acq.error is not None:
+            error, self.acq.error = self.acq.error, None
+            self.tbstart.SetBitmapLabel(self.tbstart1BMP)
+            wx.MessageBox('Acquisition stopped: %s' % error, 'Input device', wx.OK | wx.ICON_ERROR)
+
+        if result is None:
+            return
+        data, ovexp, running, err = result
+        t0 = self.timer.now()
 
         # light level warning
         if self.levelwasok and ovexp:
@@ -571,43 +793,26 @@ class pyUVVIS(wx.Frame):
             self.levelwasok = True
             self.tblightlevel.SetBitmap(self.tblightlevel1BMP)
 
-        # dark level subtraction
-        if self.dark is not None:
-            data = data - self.dark
-
-        # force minimum pixel value to be 1 to prevent NaNs
-        data = np.maximum(np.ones(len(data)), data)
-
-        # UVVIS or spectrum
-        if self.modeUVVIS and self.reference is not None:
-            data = np.nan_to_num(-np.log10(data / self.reference))
-
-        # add to running average if recording
-        if self.recording:
-            if self.data is not None:
-                self.data = (float(self.cAvg) * self.data + data) / float(self.cAvg + 1)
-                self.cAvg = self.cAvg + 1
-            else:
-                self.data = data.copy()
-                self.cAvg = 1
-
-            if self.cAvg >= self.avg:
-                self.ok_to_overwrite = False
-                self.OnTBStart()            # recording stops
-        elif self.ok_to_overwrite:
-            self.data = data.copy()
+        # show the settings chosen by the continuous auto exposure
+        if self.autoExpOn:
+            if self.camSupportsExp() and self.exp != self.expControl.exp:
+                self.exp = self.expControl.exp
+                self.tbexp.SetLabel("%.2f" % self.exp)
+            if self.camSupportsGain() and self.gain != self.expControl.gain:
+                self.gain = self.expControl.gain
+                self.tbgain.SetLabel(str(self.gain))
+
+        # recording has finished
+        if not running:
+            self.tbstart.SetBitmapLabel(self.tbstart1BMP)
 
         # force some kind of x-axis
         if self.wlAxis is None:
-            self.wlAxis = np.arange(len(self.data))
+            self.wlAxis = np.arange(len(data))
 
         # overwrite main line in plot
-        self.addLine(self.wlAxis, self.data, id=0)
-
-        # restart timer
-        if self.running:
-            wx.GetApp().Yield()    # process all GUI events to keep the program responsive
-            self.updThread.Start(200, wx.TIMER_ONE_SHOT)
+        self.addLine(self.wlAxis, data, id=0, err=err)
+        self.timer.record("update", t0, self.timer.now())
 
 if __name__ == '__main__':
     app = wx.App()
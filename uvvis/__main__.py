@@ -0,0 +1,6 @@
+# command line interface, see uvvis.cli
+import sys
+
+from uvvis.cli import main
+
+sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+.. module: uvvis.acquisition
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Background acquisition: reads spectra from the input device in a worker thread, processes them and hands the results to the GUI through a bounded queue.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import threading
+import time
+import numpy as np
+
+from uvvis.processing import ProcessingKernel, RunningStatistics, MovingAverage, ExponentialAverage
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# averaging modes for live view
+LIVE_LAST = "last"          # show the newest spectrum
+LIVE_BOXCAR = "boxcar"      # average over the last `avg` spectra
+LIVE_EMA = "ema"            # exponential moving average with the same center of mass
+
+_live_averagers = {LIVE_BOXCAR: MovingAverage, LIVE_EMA: ExponentialAverage}
+
+
+class AcquisitionController(object):
+    """Thread-safe acquisition state machine.
+
+    Spectra are read with `read` in a worker thread, dark corrected, converted to OD in UV/VIS mode and averaged while recording. The processed results are put into a bounded queue; if the consumer is too slow, the oldest results are discarded. `callback` is invoked from the worker thread whenever a result becomes available and the consumer has not been notified yet, e.g. with `wx.CallAfter` to schedule the GUI update.
+
+    Changes to the state (mode, dark, reference, ..) from other threads have to be guarded by :py:attr:`lock`. Settings of the input device should be changed with :py:func:`execute`, which defers the call until the current spectrum has been read.
+
+    If reading or processing a spectrum fails, the acquisition stops, the exception is stored in :py:attr:`error` and `callback` is invoked, so that the consumer can report it.
+    """
+    def __init__(self, read, callback = None, maxsize = 4):
+        """Constructor.
+
+        :param func read: Function that reads one spectrum from the input device and returns (data, ovexp).
+        :param func callback: Function without arguments that is called from the worker thread when new results are available.
+        :param int maxsize: Maximum number of results kept in the queue.
+        """
+        self.read = read
+        self.callback = callback
+        self.lock = threading.RLock()
+        self._device_lock = threading.RLock()
+
+        self.results = queue.Queue(maxsize)
+        self._notified = False
+        self._thread = None
+        self._active = False
+        self._pending = []
+        self._stop = threading.Event()
+        self.error = None         # exception that stopped the worker thread
+
+        # measurement mode
+        self.running = False
+        self.recording = False
+        self.modeUVVIS = False
+        self.ok_to_overwrite = False
+
+        # averaging
+        self.avg = 32
+        self.cAvg = 0
+        self.stats = RunningStatistics()
+        self.liveMode = LIVE_LAST
+        self._live = None
+
+        # current data
+        self.data = None
+        self.reference = None
+        self.dark = None
+
+        # minimum of the dark corrected spectra: 1 count or, for spectra in counts per ms, 1 count in the longest exposure time
+        self.floor = 1.0
+
+        # streaming of every processed spectrum to disk, see uvvis.recorder
+        self.recorder = None
+
+        # per-stage timing of the worker loop (read, process, record), see uvvis.timing
+        self.timer = None
+
+        # returns the timestamp of the spectrum that has just been read; uvvis.multi.DeviceGroup replaces it by the time all devices started reading
+        self.clock = time.time
+
+        self.kernel = ProcessingKernel()
+
+    def start(self, recording = False, recorder = None):
+        """Start the acquisition. Any previous result is discarded.
+
+        :param bool recording: If True, average `avg` spectra and stop afterwards. Otherwise, run in live mode until :py:func:`stop` is called.
+        :param recorder: :py:class:`uvvis.recorder.SpectrumRecorder` that receives every processed spectrum. It is closed when the acquisition stops.
+        """
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+
+        with self.lock:
+            self.running = True
+            self.recording = recording
+            self.ok_to_overwrite = True
+            self.cAvg = 0
+            self.data = None
+            self.error = None
+            self.stats.reset()
+            self._live = None
+            self.recorder = recorder
+
+        self._stop.clear()
+        self._active = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait = False):
+        """Stop the acquisition. The spectrum that is currently being read is discarded.
+
+        :param bool wait: Wait until the worker thread has finished.
+        """
+        with self.lock:
+            self.running = False
+            self.recording = False
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def wait(self, timeout = None):
+        """Wait until the acquisition has stopped, e.g. after recording the requested number of averages.
+
+        :param float timeout: Maximum time to wait in s or None to wait forever.
+        :returns: True if the acquisition has stopped.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def execute(self, func, *args):
+        """Call a function that accesses the input device, e.g. to change the exposure time. While the acquisition is running, the call is deferred until the current spectrum has been read, otherwise it is executed right away.
+
+        :param func func: Function to call.
+        :param mixed args: Arguments to pass to the function.
+        :returns: Return value of the function or None if the call was deferred.
+        """
+        with self.lock:
+            if self._active:
+                self._pending.append((func, args))
+                return
+        with self._device_lock:
+            return func(*args)
+
+    def read_now(self):
+        """Read a single spectrum synchronously, e.g. for auto exposure while the acquisition is paused.
+
+        :returns: Raw spectrum and overexposure flag (data, ovexp).
+        """
+        with self._device_lock:
+            return self.read()
+
+    def get_latest(self):
+        """Returns the newest result as tuple (data, ovexp, running, stderr) and discards older ones or returns None if there is no new result.
+        """
+        result = None
+        with self.lock:
+            self._notified = False
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return result
+
+    def process(self, data):
+        """Apply dark correction and conversion to OD to a spectrum.
+
+        :param array data: Raw spectrum.
+        :returns: Processed spectrum. This is a work buffer that is overwritten by the next call.
+        """
+        if self.modeUVVIS:
+            return self.kernel.process(data, self.dark, self.reference, self.floor)
+        return self.kernel.process(data, self.dark, floor=self.floor)
+
+    def update(self, data):
+        """Add a processed spectrum to the current dataset, i.e. to the running statistics when recording or replace the current dataset by the live average (see :py:func:`set_live_mode`) in live mode. Stops the acquisition when the requested number of averages is reached.
+
+        :param array data: Processed spectrum.
+        """
+        if self.recording:
+            self.stats.add(data)
+            self.data = self.stats.mean
+            self.cAvg = self.stats.n
+
+            if self.cAvg >= self.avg:
+                self.ok_to_overwrite = False
+                self.running = False            # recording stops
+                self.recording = False
+                self._stop.set()
+        elif self.ok_to_overwrite:
+            data = self.live_average(data)
+            if self.data is not None and self.data.shape == data.shape:
+                np.copyto(self.data, data)
+            else:
+                self.data = data.copy()
+
+    def set_live_mode(self, mode):
+        """Set the averaging mode for live view.
+
+        :param str mode: One of LIVE_LAST, LIVE_BOXCAR or LIVE_EMA. The averages are taken over :py:attr:`avg` spectra.
+        """
+        if mode != LIVE_LAST and mode not in _live_averagers:
+            raise ValueError("unknown live averaging mode %s" % mode)
+        with self.lock:
+            self.liveMode = mode
+            self._live = None
+
+    def reset_live(self):
+        """Restart the live average, e.g. after the dark spectrum or the measurement mode has changed.
+        """
+        with self.lock:
+            if self._live is not None:
+                self._live.reset()
+
+    def live_average(self, data):
+        """Add a processed spectrum to the live average.
+
+        :param array data: Processed spectrum.
+        :returns: Averaged spectrum according to :py:attr:`liveMode` or `data` itself for LIVE_LAST.
+        """
+        if self.liveMode == LIVE_LAST:
+            return data
+        if self._live is None or not isinstance(self._live, _live_averagers[self.liveMode]) or self._live.N != self.avg:
+            self._live = _live_averagers[self.liveMode](self.avg)
+        return self._live.add(data)
+
+    def stderr(self):
+        """Returns the per-pixel standard error of the recorded average or None if it is not available, i.e. in live mode or for less than two averages.
+        """
+        with self.lock:
+            if self.data is not self.stats.mean:
+                return None
+            return self.stats.stderr()
+
+    # execute deferred device calls
+    def _run_pending(self):
+        with self.lock:
+            pending, self._pending = self._pending, []
+        with self._device_lock:
+            for func, args in pending:
+                func(*args)
+
+    # worker thread
+    def _run(self):
+        error = None
+        try:
+            self._loop()
+        except Exception as e:
+            error = e
+            print("WARNING: Acquisition stopped: %s" % e)
+        finally:
+            with self.lock:
+                self._active = False
+                self.running = False
+                self.recording = False
+                recorder, self.recorder = self.recorder, None
+            self._run_pending()
+            if recorder is not None:
+                try:
+                    recorder.close()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                        print("WARNING: Recording failed: %s" % e)
+            with self.lock:
+                if error is not None:
+                    self.error = error
+                notify = error is not None and not self._notified
+                if notify:
+                    self._notified = True
+            if notify and self.callback is not None:
+                self.callback()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._run_pending()
+            timer = self.timer
+            if timer is not None:
+                t0 = timer.now()
+            with self._device_lock:
+                data, ovexp = self.read()
+            timestamp = self.clock()
+            if timer is not None:
+                t1 = timer.now()
+                timer.record("read", t0, t1)
+
+            with self.lock:
+                if self._stop.is_set():
+                    break
+                data = self.process(data)
+                self.update(data)
+                stderr = self.stats.stderr() if self.data is self.stats.mean else None
+                result = (self.data.copy(), ovexp, self.running, stderr)
+                notify = not self._notified
+                self._notified = True
+                recorder = self.recorder
+            if timer is not None:
+                t0, t1 = t1, timer.now()
+                timer.record("process", t0, t1)
+
+            # the recorder may block if the disk cannot keep up, so this is done outside the lock
+            if recorder is not None:
+                recorder.append(data, timestamp)
+                if timer is not None:
+                    timer.record("record", t1, timer.now())
+            if timer is not None:
+                timer.frame()
+
+            # bounded queue: drop the oldest result if the consumer is too slow
+            while True:
+                try:
+                    self.results.put_nowait(result)
+                    break
+                except queue.Full:
+                    try:
+                        self.results.get_nowait()
+                    except queue.Empty:
+                        pass
+
+            if notify and self.callback is not None:
+                self.callback()
@@ -0,0 +1,295 @@
+"""
+.. module: uvvis.cli
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Command line interface for unattended measurements without GUI, e.g.::
+
+    python -m uvvis devices
+    python -m uvvis dark --exp 12 --avg 100
+    python -m uvvis acquire --exp 12 --avg 500 --dark --out reference.uvb
+    python -m uvvis acquire --exp 12 --avg 500 --dark --mode od --reference reference.uvb --out sample.uvb
+    python -m uvvis acquire --device uc480 --all --exp 12 --avg 500 --out sample.uvb
+    python -m uvvis acquire --trigger rising --trigger-delay 50 --exp 1 --avg 1000 --out pumped.uvb
+
+Spectra are read, dark corrected, converted to OD and averaged by the same :py:class:`uvvis.acquisition.AcquisitionController` that is used by the GUI. Dark spectra are taken from the :py:class:`uvvis.dark.DarkLibrary` shared with the GUI. wx is not imported.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import time
+import argparse
+import numpy as np
+
+import drivers.backends as backends
+from uvvis.exposure import AutoExposure
+from uvvis.dark import DarkLibrary
+from uvvis.timing import StageTimer
+from uvvis.multi import DeviceGroup, connect_devices
+from uvvis import fileio
+
+
+def default_backend():
+    """Returns the name of the first backend with a connected device or of the simulated device if there is none.
+    """
+    names = backends.probe_backends()
+    return names[0] if names else backends.SimulatedBackend.name
+
+
+def open_device(name = None):
+    """Connect to an input device.
+
+    :param str name: Name of the backend. If None, use :py:func:`default_backend`.
+    :returns: Connected backend.
+    """
+    cam = backends.get_backend(name or default_backend())()
+    cam.connect()
+    return cam
+
+
+def configure(cam, exp = None, gain = None, auto = False, trigger = None, delay = 0, timeout = 1000):
+    """Apply exposure time, gain and trigger or run the auto exposure.
+
+    :param str trigger: Trigger edge (see :py:func:`drivers.backends.Spectrometer.set_trigger`) or None to leave the trigger unchanged.
+    :param int delay: Trigger delay in us.
+    :param float timeout: Trigger timeout in ms.
+    :returns: Exposure time and gain (exp, gain).
+    """
+    if exp is not None and cam.supports(backends.CAP_EXPOSURE):
+        cam.set_exposure(exp)
+    if gain is not None and cam.supports(backends.CAP_GAIN):
+        cam.set_gain(gain)
+    if trigger is not None:
+        if not cam.supports(backends.CAP_TRIGGER):
+            print("WARNING: %s does not support triggering.." % cam.label)
+        cam.set_trigger(trigger, delay, timeout)
+    if auto:
+        AutoExposure(cam).run()
+    return cam.get_exposure(), cam.get_gain()
+
+
+def measure(cam, avg, dark = None, reference = None, timer = None):
+    """Record the average of `avg` spectra.
+
+    :param cam: Connected input device.
+    :param int avg: Number of averages.
+    :param array dark: Dark spectrum or None.
+    :param array reference: Reference spectrum for OD or None.
+    :param timer: :py:class:`uvvis.timing.StageTimer` that records the stages of the acquisition or None.
+    :returns: Averaged spectrum, its standard error (None for a single spectrum) and a flag indicating whether the detector was saturated (data, stderr, ovexp).
+    """
+    return measure_all([cam], avg, [dark], reference, timer)[0]
+
+
+def measure_all(cams, avg, darks = None, reference = None, timer = None):
+    """Record the average of `avg` spectra from several devices at the same time (see :py:class:`uvvis.multi.DeviceGroup`).
+
+    :param list cams: Connected input devices.
+    :param int avg: Number of averages.
+    :param list darks: Dark spectrum (or None) for each device.
+    :param array reference: Reference spectrum for OD or None.
+    :param timer: :py:class:`uvvis.timing.StageTimer` that records the stages of the acquisition or None.
+    :returns: List of (data, stderr, ovexp) for each device, see :py:func:`measure`.
+    :raises: the exception that stopped the acquisition of any of the devices or RuntimeError if it stopped early.
+    """
+    ovexp = [False] * len(cams)
+
+    def reader(i):
+        def read():
+            data, o = cams[i].read()
+            ovexp[i] = ovexp[i] or o
+            return data, o
+        return read
+
+    group = DeviceGroup(cams, [reader(i) for i in range(len(cams))])
+    group.avg = avg
+    if darks is None:
+        darks = [None] * len(cams)
+    for acq, dark in zip(group.acqs, darks):
+        acq.dark = dark
+        acq.reference = reference
+        acq.modeUVVIS = reference is not None
+        acq.timer = timer
+    group.start(recording=True)
+    group.wait()
+    for acq, cam in zip(group.acqs, cams):
+        if acq.error is not None:
+            raise acq.error
+        if acq.data is None or acq.cAvg < acq.avg:
+            raise RuntimeError("acquisition of %s stopped after %d of %d spectra" % (cam.device_id(), acq.cAvg, acq.avg))
+    return [(acq.data, acq.stderr(), o) for acq, o in zip(group.acqs, ovexp)]
+
+
+def insert_name(filename, text):
+    """Returns the file name with `_text` inserted before the extension.
+    """
+    root, ext = filename.rsplit(".", 1) if "." in filename else (filename, "")
+    return "%s_%s%s" % (root, text, "." + ext if ext else "")
+
+
+def output_name(pattern, i, count, device = None):
+    """Returns the name of the i-th output file; the index is inserted before the extension if more than one file is written. If a device id is given, it is inserted as well.
+    """
+    if device is not None:
+        pattern = insert_name(pattern, device)
+    if count <= 1:
+        return pattern
+    if "%" in pattern:
+        return pattern % i
+    return insert_name(pattern, "%04d" % i)
+
+
+def cmd_devices(args):
+    for name, cls in sorted(backends.get_backends().items()):
+        devices = cls.devices()
+        devices = ["connected" if d is None else str(d) for d in devices]
+        print("%-12s %-20s %s" % (name, cls.label, ", ".join(devices) if devices else "-"))
+    return 0
+
+
+def cmd_dark(args):
+    cam = open_device(args.device)
+    try:
+        exp, gain = configure(cam, args.exp, args.gain, trigger=args.trigger, delay=args.trigger_delay, timeout=args.trigger_timeout)
+        try:
+            data, _, _ = measure(cam, args.avg)
+        except Exception as e:
+            print("ERROR: %s" % e)
+            return 1
+        DarkLibrary(args.darks).add(cam.dark_id(), exp, gain, data, cam.get_temperature())
+        print("stored dark spectrum for %s, exposure %g ms, gain %g" % (cam.device_id(), exp, gain))
+    finally:
+        cam.close()
+    return 0
+
+
+def cmd_acquire(args):
+    reference = None
+    if args.mode == "od":
+        if args.reference is None:
+            print("ERROR: --mode od needs a --reference spectrum")
+            return 1
+        reference = np.array(fileio.load_spectrum(args.reference)[1], dtype=float)
+
+    if args.all:
+        cams = connect_devices(args.device or default_backend())
+    else:
+        cams = [open_device(args.device)]
+    timer = None
+    try:
+        # settings and dark spectrum of each device
+        settings = []
+        for cam in cams:
+            exp, gain = configure(cam, args.exp, args.gain, args.auto, args.trigger, args.trigger_delay, args.trigger_timeout)
+            dark = None
+            if args.dark:
+                dark = DarkLibrary(args.darks).get(cam.dark_id(), exp, gain, cam.get_temperature())
+                if dark is None:
+                    print("ERROR: no dark spectrum for %s, exposure time %g ms and gain %g; take one with the dark command" % (cam.device_id(), exp, gain))
+                    return 1
+            settings.append((exp, gain, cam.wavelengths(), dark))
+
+        if args.trace:
+            timer = StageTimer(maxlen=max(1000, args.avg * args.repeat * len(cams)))
+            for cam in cams:
+                cam.set_timer(timer)
+
+        for i in range(args.repeat):
+            t0 = time.time()
+            try:
+                results = measure_all(cams, args.avg, [dark for exp, gain, wl, dark in settings], reference, timer)
+            except Exception as e:
+                print("ERROR: %s" % e)
+                return 1
+            for cam, (exp, gain, wl, dark), (data, err, ovexp) in zip(cams, settings, results):
+                if ovexp:
+                    print("WARNING: Detector of %s saturated.." % cam.device_id())
+                if wl is None:
+                    wl = np.arange(len(data))
+
+                filename = output_name(args.out, i, args.repeat, cam.device_id() if len(cams) > 1 else None)
+                meta = dict(exposure=exp, gain=gain, averages=args.avg, dark=dark is not None, reference=reference is not None,
+                            device=cam.device_id(), time=t0)
+                if args.text:
+                    fileio.save_text(filename, wl, data, err)
+                else:
+                    fileio.save_binary(filename, wl, data, errors=err, **meta)
+                if not args.quiet:
+                    print("%s: %d averages in %.2fs" % (filename, args.avg, time.time() - t0))
+
+            if i + 1 < args.repeat and args.interval > 0:
+                time.sleep(max(0, t0 + args.interval - time.time()))
+    finally:
+        for cam in cams:
+            cam.close()
+        if timer is not None:
+            timer.export_trace(args.trace)
+            if not args.quiet:
+                print(timer.summary())
+    return 0
+
+
+def make_parser():
+    """Returns the argument parser of the command line interface.
+    """
+    parser = argparse.ArgumentParser(prog="python -m uvvis", description="pyUVVIS without GUI.")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("devices", help="list input devices")
+    p.set_defaults(func=cmd_devices)
+
+    def settings(p):
+        p.add_argument("--device", help="backend name (default: first connected device)")
+        p.add_argument("--exp", type=float, help="exposure time in ms")
+        p.add_argument("--gain", type=float, help="gain")
+        p.add_argument("--avg", type=int, default=32, help="number of averages (default: 32)")
+        p.add_argument("--darks", default="darks.npz", help="dark spectrum library (default: darks.npz)")
+        p.add_argument("--trigger", choices=["off", "rising", "falling"], help="take the spectra on this edge of the external trigger")
+        p.add_argument("--trigger-delay", type=int, default=0, help="delay between trigger and exposure in us (default: 0)")
+        p.add_argument("--trigger-timeout", type=float, default=1000, help="time to wait for a trigger in ms (default: 1000)")
+
+    p = sub.add_parser("dark", help="record a dark spectrum and add it to the library")
+    settings(p)
+    p.set_defaults(func=cmd_dark)
+
+    p = sub.add_parser("acquire", help="record averaged spectra")
+    settings(p)
+    p.add_argument("--all", action="store_true", help="record from all connected devices of the backend at the same time; the device id is added to the output file names")
+    p.add_argument("--auto", action="store_true", help="set exposure time / gain automatically")
+    p.add_argument("--dark", action="store_true", help="subtract the dark spectrum from the library")
+    p.add_argument("--mode", choices=["counts", "od"], default="counts", help="output counts or OD (default: counts)")
+    p.add_argument("--reference", help="reference spectrum for --mode od")
+    p.add_argument("--out", required=True, help="output file; with --repeat, an index is added before the extension or inserted for a %%d pattern")
+    p.add_argument("--text", action="store_true", help="write a text file instead of the binary format")
+    p.add_argument("--repeat", type=int, default=1, help="number of measurements (default: 1)")
+    p.add_argument("--interval", type=float, default=0, help="time between the starts of two measurements in s")
+    p.add_argument("--quiet", action="store_true", help="do not print progress")
+    p.add_argument("--trace", help="write the timing of the acquisition stages to this file (Chrome trace format)")
+    p.set_defaults(func=cmd_acquire)
+    return parser
+
+
+def main(argv = None):
+    """Run the command line interface.
+
+    :param list argv: Arguments; if None, use sys.argv.
+    :returns: Exit code.
+    """
+    args = make_parser().parse_args(argv)
+    if getattr(args, "func", None) is None:
+        make_parser().print_help()
+        return 1
+    return args.func(args)
@@ -0,0 +1,183 @@
+"""
+.. module: uvvis.dark
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Library of dark spectra.
+
+A dark spectrum is only valid for the settings it was taken with. The library stores dark spectra by device and readout geometry, gain and detector temperature (if available) and, for each of these, by exposure time. As the dark signal grows linearly with the exposure time, dark spectra for exposure times in between two stored ones are interpolated linearly and dark spectra for shorter or longer exposure times are extrapolated linearly from the two closest stored ones, i.e. from the offset and the dark rate. The library is saved to a *.npz* file whenever a spectrum is added.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import os
+import json
+import bisect
+import threading
+import numpy as np
+
+
+class DarkLibrary(object):
+    """Dark spectra by (device, gain, temperature) and exposure time. The library may be used from several threads, e.g. dark spectra are looked up in the acquisition thread while new ones are added from the GUI.
+
+    :var str state: How the spectrum returned by the last call to :py:func:`get` was obtained: 'exact', 'interpolated', 'extrapolated', 'nearest' (only one exposure time stored) or None if there was none.
+    """
+    def __init__(self, filename = None, tstep = 1.0, maxdt = 5.0):
+        """Constructor.
+
+        :param str filename: Name of the file the library is stored in. If the file exists, the library is loaded from it. If None, the library is not saved.
+        :param float tstep: Temperatures are rounded to multiples of this step (deg C).
+        :param float maxdt: Maximum temperature difference (deg C) up to which dark spectra taken at another temperature are used.
+        """
+        self.filename = filename
+        self.tstep = tstep
+        self.maxdt = maxdt
+        self._darks = {}          # (device, gain, temperature) -> {exposure: spectrum}
+        self._last = None         # last lookup and its result
+        self._lock = threading.RLock()
+        self.state = None
+
+        if filename is not None and os.path.exists(filename):
+            try:
+                self.load()
+            except Exception as e:
+                print("WARNING: Could not load dark spectra from %s: %s" % (filename, e))
+
+    def _temperature(self, temperature):
+        if temperature is None:
+            return None
+        return round(temperature / self.tstep) * self.tstep
+
+    # returns the dark spectra by exposure time for the given settings; temperatures are matched to the nearest stored one
+    def _entries(self, device, gain, temperature):
+        temperature = self._temperature(temperature)
+        entries = self._darks.get((device, gain, temperature))
+        if entries is not None or temperature is None:
+            return entries
+
+        best = None
+        for (d, g, t), e in self._darks.items():
+            if d == device and g == gain and t is not None and abs(t - temperature) <= self.maxdt:
+                if best is None or abs(t - temperature) < best[0]:
+                    best = (abs(t - temperature), e)
+        return None if best is None else best[1]
+
+    def add(self, device, exposure, gain, dark, temperature = None):
+        """Add a dark spectrum and save the library.
+
+        :param str device: Device id including the readout geometry, see :py:func:`drivers.backends.Spectrometer.dark_id`.
+        :param float exposure: Exposure time in ms.
+        :param float gain: Gain.
+        :param array dark: Dark spectrum in counts.
+        :param float temperature: Detector temperature in deg C or None.
+        """
+        key = (device, gain, self._temperature(temperature))
+        with self._lock:
+            self._darks.setdefault(key, {})[float(exposure)] = np.array(dark, dtype=float)
+            self._last = None
+        if self.filename is not None:
+            self.save()
+
+    def get(self, device, exposure, gain, temperature = None):
+        """Returns the dark spectrum for the given settings or None if there is none. If there is no spectrum for the exposure time, it is interpolated between the two closest stored exposure times or, outside of the stored range, extrapolated from the two closest ones. If only one exposure time is stored, its spectrum is returned. :py:attr:`state` tells which of these applied.
+
+        :param str device: Device id.
+        :param float exposure: Exposure time in ms.
+        :param float gain: Gain.
+        :param float temperature: Detector temperature in deg C or None.
+        :returns: Dark spectrum. The array is shared between calls and must not be modified.
+        """
+        args = (device, float(exposure), gain, self._temperature(temperature))
+        with self._lock:
+            if self._last is not None and self._last[0] == args:
+                self.state = self._last[2]
+                return self._last[1]
+
+            dark, state = None, None
+            entries = self._entries(device, gain, temperature)
+            if entries:
+                exposure = float(exposure)
+                exps = sorted(entries)
+                i = bisect.bisect(exps, exposure)
+                if exposure in entries:
+                    dark, state = entries[exposure], "exact"
+                elif len(exps) == 1:
+                    dark, state = entries[exps[0]], "nearest"
+                else:
+                    # interpolate between the neighbouring exposure times or extrapolate from the two closest ones
+                    i = min(max(i, 1), len(exps) - 1)
+                    e0, e1 = exps[i - 1], exps[i]
+                    if len(entries[e0]) == len(entries[e1]):
+                        w = (exposure - e0) / (e1 - e0)
+                        dark = (1.0 - w) * entries[e0] + w * entries[e1]
+                        state = "interpolated" if 0.0 <= w <= 1.0 else "extrapolated"
+                    else:
+                        e = e0 if abs(exposure - e0) < abs(exposure - e1) else e1
+                        dark, state = entries[e], "nearest"
+
+            self._last = (args, dark, state)
+            self.state = state
+        return dark
+
+    def exposures(self, device, gain, temperature = None):
+        """Returns the sorted list of exposure times for which dark spectra are stored.
+        """
+        with self._lock:
+            return sorted(self._entries(device, gain, temperature) or [])
+
+    def clear(self, device = None):
+        """Remove all dark spectra of a device or, if device is None, all dark spectra.
+        """
+        with self._lock:
+            for key in list(self._darks):
+                if device is None or key[0] == device:
+                    del self._darks[key]
+            self._last = None
+        if self.filename is not None:
+            self.save()
+
+    def save(self, filename = None):
+        """Save the library to a *.npz* file.
+
+        :param str filename: Name of the file. If None, use :py:attr:`filename`.
+        """
+        with self._lock:
+            darks = [(key, list(entries.items())) for key, entries in self._darks.items()]
+
+        index = []
+        arrays = {}
+        for (device, gain, temperature), entries in darks:
+            for exposure, dark in entries:
+                arrays["dark%d" % len(index)] = dark
+                index.append([device, gain, temperature, exposure])
+        arrays["index"] = np.array(json.dumps(index))
+
+        with open(filename or self.filename, "wb") as f:
+            np.savez(f, **arrays)
+
+    def load(self, filename = None):
+        """Load the library from a *.npz* file, replacing all spectra.
+
+        :param str filename: Name of the file. If None, use :py:attr:`filename`.
+        """
+        darks = {}
+        with np.load(filename or self.filename) as f:
+            index = json.loads(str(f["index"]))
+            for i, (device, gain, temperature, exposure) in enumerate(index):
+                darks.setdefault((device, gain, temperature), {})[exposure] = f["dark%d" % i]
+        with self._lock:
+            self._darks = darks
+            self._last = None
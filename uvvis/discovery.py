@@ -0,0 +1,132 @@
+"""
+.. module: uvvis.discovery
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Asynchronous discovery of connected input devices.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import threading
+import time
+
+import drivers.backends as backends
+
+
+class DeviceDiscovery(object):
+    """Probes all registered backends for connected devices in background threads.
+
+    Every backend is probed in its own thread, so that a slow or hanging driver neither blocks the caller nor the other backends. Backends that do not answer within `timeout` are treated as not available.
+    """
+    def __init__(self, timeout = 5.0, callback = None):
+        """Constructor.
+
+        :param float timeout: Maximum time in s to wait for each backend.
+        :param func callback: Function that is called with the list of available backend names when discovery has finished. It is called from a worker thread, so GUI applications should wrap it, e.g. with `wx.CallAfter`.
+        """
+        self.timeout = timeout
+        self.results = {}          # backend name -> True / False / None (timed out)
+        self.finished = threading.Event()
+        self.timestamp = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._callbacks = []
+        if callback is not None:
+            self._callbacks.append(callback)
+
+    def start(self):
+        """Start the discovery and return immediately.
+        """
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add_callback(self, callback):
+        """Add a function that is called with the list of available backend names when discovery has finished. If discovery has already finished, it is called right away.
+        """
+        with self._lock:
+            if not self.finished.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self.available())
+
+    def wait(self, timeout = None):
+        """Wait for the discovery to finish and return the names of the available backends.
+
+        :param float timeout: Maximum time to wait in s (None = until finished).
+        """
+        self.finished.wait(timeout)
+        return self.available()
+
+    def available(self):
+        """Returns the names of the backends that have been found so far.
+        """
+        return sorted(name for name, found in self.results.items() if found)
+
+    def _probe(self, name, cls):
+        try:
+            self.results[name] = cls.available()
+        except Exception:
+            self.results[name] = False
+
+    def _run(self):
+        threads = []
+        for name, cls in sorted(backends.get_backends().items()):
+            if cls.simulated:
+                continue
+            self.results[name] = None
+            thread = threading.Thread(target=self._probe, args=(name, cls))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        deadline = time.time() + self.timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.time()))
+
+        with self._lock:
+            self.timestamp = time.time()
+            self.finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self.available())
+
+
+# cached discovery shared by all callers
+_discovery = None
+
+
+def discover(callback = None, timeout = 5.0, refresh = False, max_age = None):
+    """Start device discovery or reuse the results of a previous one.
+
+    :param func callback: Function that is called with the list of available backend names when discovery has finished (see :py:class:`DeviceDiscovery`). If cached results are used, it is called right away.
+    :param float timeout: Maximum time in s to wait for each backend.
+    :param bool refresh: Discard cached results and probe again.
+    :param float max_age: Probe again if the cached results are older than this (in s).
+    :returns: :py:class:`DeviceDiscovery` instance.
+    """
+    global _discovery
+    if _discovery is not None and not refresh:
+        expired = max_age is not None and _discovery.timestamp is not None and time.time() - _discovery.timestamp > max_age
+        if not expired:
+            if callback is not None:
+                _discovery.add_callback(callback)
+            return _discovery
+
+    _discovery = DeviceDiscovery(timeout, callback)
+    _discovery.start()
+    return _discovery
@@ -0,0 +1,54 @@
+"""
+.. module: uvvis.display
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Helper functions for displaying spectra.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import numpy as np
+
+
+def decimate(x, y, nbins):
+    """Reduce a line to about 2 x `nbins` points for display while preserving its extrema.
+
+    The data is split into `nbins` consecutive bins and each bin is replaced by its minimum and maximum value, so that narrow peaks do not disappear when the line has more points than the plot window has pixels.
+
+    :param array x: x-values.
+    :param array y: y-values.
+    :param int nbins: Number of bins, e.g. the width of the plot window in pixels.
+    :returns: Array of points with shape (N, 2) as used by `wx.lib.plot.PolyLine`.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    nbins = int(nbins)
+    if nbins < 1 or len(y) <= 2 * nbins:
+        return np.column_stack((x, y))
+
+    edges = np.linspace(0, len(y), nbins + 1).astype(int)
+    start = edges[:-1]
+    ymin = np.minimum.reduceat(y, start)
+    ymax = np.maximum.reduceat(y, start)
+    xc = 0.5 * (x[start] + x[edges[1:] - 1])
+
+    points = np.empty((2 * nbins, 2))
+    points[0::2, 0] = xc
+    points[1::2, 0] = xc
+    points[0::2, 1] = ymin
+    points[1::2, 1] = ymax
+    return points
@@ -0,0 +1,232 @@
+"""
+.. module: uvvis.exposure
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Automatic exposure time and gain settings.
+
+:py:class:`AutoExposure` searches the settings once while the acquisition is paused, :py:class:`ExposureControl` keeps adjusting them between the spectra during live view.
+
+The peak signal is assumed to depend linearly on the exposure time (and monotonically on the gain). Starting from the current setting, the setting that fills the detector to a target fraction of its saturation level is predicted from the last two unsaturated readings (or from a single reading and the origin). Predictions that fall outside the interval known to contain the target, e.g. after the detector saturated, are replaced by bisection of that interval. This usually converges within a few frames.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import numpy as np
+
+from drivers.backends import CAP_EXPOSURE, CAP_GAIN
+
+
+class AutoExposure(object):
+    """Finds the exposure time and gain for which the peak pixel value reaches `target` x `satlevel`.
+
+    The exposure time is adjusted first at the lowest gain; the gain is only raised if the signal is too weak at the longest exposure time. All device access goes through the backend, so :py:func:`run` should be called with :py:func:`uvvis.acquisition.AcquisitionController.execute`.
+    """
+    def __init__(self, cam, target = 0.8, tolerance = 0.05, maxframes = 16):
+        """Constructor.
+
+        :param cam: Input device, see :py:class:`drivers.backends.Spectrometer`.
+        :param float target: Target peak value as fraction of the saturation level.
+        :param float tolerance: Accepted deviation from the target as fraction of the saturation level.
+        :param int maxframes: Maximum number of frames to read per setting.
+        """
+        self.cam = cam
+        self.target = target
+        self.tolerance = tolerance
+        self.maxframes = maxframes
+        self.frames = 0
+
+    def run(self):
+        """Adjust exposure time and gain.
+
+        :returns: Exposure time, gain and peak pixel value at the final setting (exp, gain, peak).
+        """
+        cam = self.cam
+        self.frames = 0
+        peak = None
+        goal = (self.target - self.tolerance) * cam.satlevel
+
+        if cam.supports(CAP_GAIN) and cam.supports(CAP_EXPOSURE):
+            cam.set_gain(cam.get_gain_limits()[0])
+        if cam.supports(CAP_EXPOSURE):
+            peak = self.search(cam.set_exposure, cam.get_exposure(), cam.get_exposure_limits())
+        if cam.supports(CAP_GAIN) and (peak is None or peak < goal):
+            peak = self.search(cam.set_gain, cam.get_gain(), cam.get_gain_limits())
+        if peak is None:
+            peak = float(cam.read_peak()[1])
+        return cam.get_exposure(), cam.get_gain(), peak
+
+    def measure(self, setter, value):
+        """Apply a setting and return the peak pixel value of the next spectrum as float, as the raw value may be an unsigned integer (differences would wrap around).
+        """
+        setter(value)
+        self.frames += 1
+        return float(self.cam.read_peak()[1])
+
+    def search(self, setter, value, limits):
+        """Search the setting for which the peak pixel value is closest to the target.
+
+        :param func setter: Function that applies a setting.
+        :param float value: Start value.
+        :param tuple limits: Limits of the setting (*min, max, increment*).
+        :returns: Peak pixel value at the final setting, which is left applied.
+        """
+        vmin, vmax, inc = limits
+        sat = float(self.cam.satlevel)
+        goal = self.target * sat
+        tol = self.tolerance * sat
+
+        lo, hi = vmin, vmax        # interval that contains the target setting
+        points = []                # unsaturated readings (value, peak)
+        best = None                # unsaturated reading closest to the target
+        tried = set()
+        value = min(max(value, vmin), vmax)
+        frames = 0
+        while frames < self.maxframes:
+            peak = self.measure(setter, value)
+            frames += 1
+            tried.add(value)
+            if peak < sat:
+                points.append((value, peak))
+                if best is None or abs(peak - goal) < abs(best[1] - goal):
+                    best = (value, peak)
+                if abs(peak - goal) <= tol:
+                    return peak
+            if peak < goal:
+                lo = value
+                if value >= vmax:
+                    break          # too dark even at the upper limit
+            else:
+                hi = value
+                if value <= vmin:
+                    break          # too bright even at the lower limit
+
+            # predictions beyond a limit that has not been tried yet go to that limit, otherwise the interval is bisected
+            nxt = self.predict(points, goal)
+            if nxt is None:
+                nxt = 0.5 * (lo + hi)
+            elif nxt >= hi:
+                nxt = hi if hi not in tried else 0.5 * (lo + hi)
+            elif nxt <= lo:
+                nxt = lo if lo not in tried else 0.5 * (lo + hi)
+            if inc > 0:
+                nxt = vmin + round((nxt - vmin) / float(inc)) * inc
+            nxt = min(max(nxt, vmin), vmax)
+            if nxt in tried:
+                break              # interval cannot be divided any further
+            value = nxt
+
+        if best is not None and best[0] != value:
+            setter(best[0])
+            return best[1]
+        return peak
+
+    def predict(self, points, goal):
+        """Predict the setting that yields the target peak value from the linear relation between setting and peak value.
+
+        :param list points: Unsaturated readings (value, peak).
+        :param float goal: Target peak value.
+        :returns: Predicted setting or None if there is not enough information.
+        """
+        if len(points) >= 2 and points[-1][0] != points[-2][0]:
+            (v0, p0), (v1, p1) = points[-2], points[-1]
+            slope = (p1 - p0) / float(v1 - v0)
+            if slope > 0:
+                return v1 + (goal - p1) / slope
+        if len(points) >= 1 and points[-1][1] > 0 and points[-1][0] > 0:
+            v1, p1 = points[-1]
+            return v1 * goal / float(p1)
+        return None
+
+
+class ExposureControl(object):
+    """Closed-loop exposure control for continuous acquisition, e.g. for drifting lamps.
+
+    :py:func:`read` replaces the read function of the input device: after every spectrum, the peak pixel value is compared to the saturation level. If it leaves the band between `low` and `high` (hysteresis), the exposure time is set to bring the peak back to `target`; the gain is only changed if the exposure time is at its limit. As the exposure time changes from spectrum to spectrum, the spectra are returned in counts per ms; dark corrected spectra are clamped to 1 count before the conversion, so they are at least :py:attr:`floor`, i.e. 1 count in the longest exposure time. Changing the gain changes the counts per ms, so `reset` is called in that case to restart running averages.
+    """
+    def __init__(self, cam, target = 0.7, low = 0.5, high = 0.9, settle = None, reset = None, dark = None):
+        """Constructor.
+
+        :param cam: Input device, see :py:class:`drivers.backends.Spectrometer`.
+        :param float target: Target peak value as fraction of the saturation level.
+        :param float low: Lower edge of the band in which the settings are kept (fraction of saturation level).
+        :param float high: Upper edge of the band in which the settings are kept (fraction of saturation level).
+        :param int settle: Number of spectra discarded after a change, which may have been exposed with the old settings. If None, use the `settle` attribute of the input device.
+        :param func reset: Function without arguments that is called when the gain has been changed.
+        :param func dark: Function that returns the dark spectrum in counts for given exposure time and gain (exp, gain) or None. The dark spectrum is subtracted before the conversion to counts per ms.
+        """
+        self.cam = cam
+        self.target = target
+        self.low = low
+        self.high = high
+        self.settle = cam.settle if settle is None else settle
+        self.reset = reset
+        self.dark = dark
+        self.floor = 1.0 / cam.get_exposure_limits()[1] if cam.supports(CAP_EXPOSURE) else 1.0
+        self.sync()
+
+    def sync(self):
+        """Read the current settings from the input device.
+        """
+        self.exp = self.cam.get_exposure() if self.cam.supports(CAP_EXPOSURE) else 1.0
+        self.gain = self.cam.get_gain() if self.cam.supports(CAP_GAIN) else 0
+
+    def read(self):
+        """Read a spectrum and adjust the settings for the next one.
+
+        :returns: Spectrum in counts per ms and a flag indicating whether the detector was saturated (data, ovexp).
+        """
+        self.sync()    # settings may have been changed by the user
+        data, peak = self.cam.read_peak()
+        exp = self.exp
+        if self.dark is not None:
+            dark = self.dark(exp, self.gain)
+            if dark is not None and len(dark) == len(data):
+                data = data - dark
+        data = np.maximum(data, 1.0)
+        sat = float(self.cam.satlevel)
+        if not self.low * sat <= peak <= self.high * sat and self.adjust(peak / sat):
+            for i in range(self.settle):
+                self.cam.read_peak()
+        return data / float(exp), peak >= sat
+
+    def adjust(self, level):
+        """Change the settings to bring the peak from `level` to `target` (fractions of the saturation level).
+
+        :returns: True if a setting was changed.
+        """
+        cam = self.cam
+        # a saturated detector does not tell how far off we are, so halve the signal
+        factor = 0.5 if level >= 1.0 else self.target / max(level, 1e-3)
+
+        if cam.supports(CAP_EXPOSURE):
+            expmin, expmax, _ = cam.get_exposure_limits()
+            exp = min(max(self.exp * factor, expmin), expmax)
+            if exp != self.exp:
+                cam.set_exposure(exp)
+                self.exp = cam.get_exposure()
+                return True
+
+        if cam.supports(CAP_GAIN):
+            gainmin, gainmax, gaininc = cam.get_gain_limits()
+            gain = min(max(self.gain + (gaininc if factor > 1 else -gaininc), gainmin), gainmax)
+            if gain != self.gain:
+                cam.set_gain(gain)
+                self.gain = cam.get_gain()
+                if self.reset is not None:
+                    self.reset()
+                return True
+        return False
@@ -0,0 +1,210 @@
+"""
+.. module: uvvis.fileio
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Reading and writing of spectra.
+
+Besides plain text files with two columns (wavelength, data), spectra can be stored in a binary container that keeps the full floating point precision and the acquisition settings. A binary file consists of
+
+    - the magic string *UVVISBIN* followed by a format version (uint32) and the length of the header (uint32),
+    - a JSON encoded header with the acquisition settings, the data type and the shape of the data, padded with spaces to a multiple of 64 bytes,
+    - the wavelength axis as little endian float64,
+    - the data in the data type given in the header (little endian float32 or float64); the last axis has the length of the wavelength axis.
+
+If the header contains `"errors": true`, the data is followed by the per-pixel standard errors in the same data type and shape.
+
+If the header contains `"timestamps": true`, each spectrum is preceded by its timestamp (float64, seconds since the epoch). This layout is used for time series, which are written spectrum by spectrum while the number of spectra in the header is updated (see :py:class:`uvvis.recorder.SpectrumRecorder`).
+
+Binary files are opened with :py:class:`numpy.memmap`, i.e. the data is only read from disk when accessed.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import json
+import struct
+import numpy as np
+
+MAGIC = b"UVVISBIN"
+VERSION = 1
+EXTENSION = ".uvb"
+
+_prefix = struct.Struct("<8sII")
+
+
+def record_dtype(dtype, npx):
+    """Returns the structured data type of one spectrum of a time series: timestamp `t` and data `data`.
+    """
+    return np.dtype([("t", "<f8"), ("data", np.dtype(dtype).newbyteorder("<"), (npx,))])
+
+
+def write_header(f, meta, size = None):
+    """Write the magic string and the header to the beginning of an open file.
+
+    :param file f: File opened in binary mode.
+    :param dict meta: Header.
+    :param int size: Total size of magic string and header in bytes. If None, the header is padded to a multiple of 64 bytes.
+    :returns: Total size of magic string and header, i.e. the offset of the wavelength axis.
+    :raises ValueError: if the header does not fit into `size`.
+    """
+    header = json.dumps(meta).encode("utf-8")
+    if size is None:
+        size = _prefix.size + len(header) + (-(len(header) + _prefix.size) % 64)
+    if _prefix.size + len(header) > size:
+        raise ValueError("header does not fit into %d bytes" % size)
+    header += b" " * (size - _prefix.size - len(header))
+
+    f.seek(0)
+    f.write(_prefix.pack(MAGIC, VERSION, len(header)))
+    f.write(header)
+    return size
+
+
+def is_binary(filename):
+    """Returns True if the file is a binary spectrum file.
+    """
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def save_binary(filename, wl, data, dtype = np.float64, errors = None, **meta):
+    """Save a spectrum (or a stack of spectra) in the binary format.
+
+    :param str filename: Name of the file.
+    :param array wl: Wavelength axis.
+    :param array data: Spectrum; the last axis has to have the same length as `wl`.
+    :param dtype: Data type used for storing the data (float32 or float64).
+    :param array errors: Per-pixel standard errors of `data` or None.
+    :param mixed meta: Acquisition settings stored in the header, e.g. `exposure`, `gain`, `averages`, `dark` and `reference`. Values have to be JSON serializable.
+    """
+    wl = np.ascontiguousarray(wl, dtype="<f8")
+    dtype = np.dtype(dtype).newbyteorder("<")
+    data = np.ascontiguousarray(data, dtype=dtype)
+    if data.shape[-1] != len(wl):
+        raise ValueError("data and wavelength axis have different lengths")
+    if errors is not None:
+        errors = np.ascontiguousarray(errors, dtype=dtype)
+        if errors.shape != data.shape:
+            raise ValueError("data and errors have different shapes")
+
+    header = dict(meta)
+    header.update({"dtype": dtype.str, "shape": list(data.shape), "errors": errors is not None})
+
+    with open(filename, "wb") as f:
+        write_header(f, header)
+        f.write(wl.tobytes())
+        f.write(data.tobytes())
+        if errors is not None:
+            f.write(errors.tobytes())
+
+
+def read_header(filename):
+    """Returns the header of a binary spectrum file as dictionary and the offset of the wavelength axis in bytes.
+
+    :raises ValueError: if the file is not a binary spectrum file.
+    """
+    with open(filename, "rb") as f:
+        magic, version, length = _prefix.unpack(f.read(_prefix.size))
+        if magic != MAGIC:
+            raise ValueError("%s is not a binary spectrum file" % filename)
+        if version > VERSION:
+            raise ValueError("%s has unsupported format version %d" % (filename, version))
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, _prefix.size + length
+
+
+def load_binary(filename, mmap = True):
+    """Load a spectrum from a binary file.
+
+    :param str filename: Name of the file.
+    :param bool mmap: If True, the data is memory mapped (read-only) instead of being read into memory.
+    :returns: Wavelength axis, data and header with the acquisition settings (wl, data, meta). For time series, the timestamps are returned in `meta["timestamps"]`, the standard errors, if stored, in `meta["errors"]`.
+    """
+    meta, offset = read_header(filename)
+    shape = tuple(meta["shape"])
+    dtype = np.dtype(meta["dtype"])
+    npx = shape[-1]
+
+    if meta.get("timestamps", False):
+        rdtype = record_dtype(dtype, npx)
+        if mmap:
+            wl = np.memmap(filename, dtype="<f8", mode="r", offset=offset, shape=(npx,))
+            records = np.memmap(filename, dtype=rdtype, mode="r", offset=offset + 8 * npx, shape=(shape[0],))
+        else:
+            with open(filename, "rb") as f:
+                f.seek(offset)
+                wl = np.fromfile(f, dtype="<f8", count=npx)
+                records = np.fromfile(f, dtype=rdtype, count=shape[0])
+        meta["timestamps"] = records["t"]
+        return wl, records["data"], meta
+
+    count = int(np.prod(shape))
+    errors = None
+    if mmap:
+        wl = np.memmap(filename, dtype="<f8", mode="r", offset=offset, shape=(npx,))
+        data = np.memmap(filename, dtype=dtype, mode="r", offset=offset + 8 * npx, shape=shape)
+        if meta.get("errors", False):
+            errors = np.memmap(filename, dtype=dtype, mode="r", offset=offset + 8 * npx + dtype.itemsize * count, shape=shape)
+    else:
+        with open(filename, "rb") as f:
+            f.seek(offset)
+            wl = np.fromfile(f, dtype="<f8", count=npx)
+            data = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+            if meta.get("errors", False):
+                errors = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    meta["errors"] = errors
+    return wl, data, meta
+
+
+def save_text(filename, wl, data, errors = None):
+    """Save a spectrum as text file with two columns (wavelength, data) or, if `errors` is given, three columns (wavelength, data, standard error).
+    """
+    columns = [wl, data] if errors is None else [wl, data, errors]
+    np.savetxt(filename, np.transpose(np.array(columns)))
+
+
+def load_text(filename):
+    """Load a spectrum from a text file with two columns (wavelength, data) or three columns (wavelength, data, standard error).
+
+    :returns: Wavelength axis, data and standard errors (wl, data, errors); errors is None for files with two columns.
+    """
+    columns = np.loadtxt(filename, unpack=True)
+    if len(columns) > 2:
+        return columns[0], columns[1], columns[2]
+    return columns[0], columns[1], None
+
+
+def save_spectrum(filename, wl, data, errors = None, **meta):
+    """Save a spectrum in binary format if the filename ends with :py:data:`EXTENSION` and as text file otherwise.
+
+    :param array errors: Per-pixel standard errors of `data` or None.
+    :param mixed meta: Acquisition settings (binary format only), see :py:func:`save_binary`.
+    """
+    if filename.lower().endswith(EXTENSION):
+        save_binary(filename, wl, data, errors=errors, **meta)
+    else:
+        save_text(filename, wl, data, errors)
+
+
+def load_spectrum(filename):
+    """Load a spectrum from a binary or text file. The format is detected automatically.
+
+    :returns: Wavelength axis, data and acquisition settings (wl, data, meta); for text files, meta only contains the standard errors `errors`, which are None if not stored.
+    """
+    if is_binary(filename):
+        return load_binary(filename)
+    wl, data, errors = load_text(filename)
+    return wl, data, {"errors": errors}
@@ -0,0 +1,132 @@
+"""
+.. module: uvvis.hdr
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+High dynamic range acquisition by exposure bracketing.
+
+The input device cycles through a list of exposure times. The spectra are converted to counts per ms and merged point by point, weighting every unsaturated point by its exposure time (i.e. by its number of counts, which is optimal for shot noise limited signals); saturated points are ignored. Weak parts of the spectrum are thus taken from the long exposures, while the peaks come from the short ones.
+
+The next exposure time is set right after a spectrum has been read and before it is merged, and every new spectrum yields a merged result with the latest spectrum of every exposure time. Exposure and merging only overlap for devices that capture continuously, e.g. uc480 cameras in trigger mode; in single frame mode, the next exposure starts with the next call to :py:func:`HDRAcquisition.read`.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import numpy as np
+
+
+def bracket(exp, expmax, n = 3, factor = 4.0):
+    """Returns a list of up to `n` exposure times starting at `exp` and increasing by `factor`, limited to `expmax`.
+    """
+    exps = [exp]
+    while len(exps) < n and exps[-1] * factor <= expmax:
+        exps.append(exps[-1] * factor)
+    return exps
+
+
+def merge(rates, exposures, saturated, out = None):
+    """Merge spectra taken with different exposure times.
+
+    :param list rates: Spectra in counts per ms.
+    :param list exposures: Exposure times in ms.
+    :param list saturated: Boolean arrays that are True for the saturated points of each spectrum.
+    :param array out: Array that receives the result or None.
+    :returns: Merged spectrum in counts per ms. Points that are saturated in all spectra are taken from the shortest exposure.
+    """
+    npx = len(rates[0])
+    num = np.zeros(npx)
+    den = np.zeros(npx)
+    w = np.empty(npx)
+    for rate, exp, sat in zip(rates, exposures, saturated):
+        np.logical_not(sat, out=w, casting="unsafe")
+        w *= exp
+        den += w
+        w *= rate
+        num += w
+
+    if out is None:
+        out = np.empty(npx)
+    shortest = int(np.argmin(exposures))
+    np.copyto(out, rates[shortest])
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+class HDRAcquisition(object):
+    """Exposure bracketing with cyclic exposure times. :py:func:`read` replaces the read function of the input device.
+
+    Dark corrected spectra are clamped to 1 count before they are converted to counts per ms, so the merged spectrum is at least :py:attr:`floor`, i.e. 1 count in the longest exposure time. Use it as floor of further processing (see :py:attr:`uvvis.acquisition.AcquisitionController.floor`).
+    """
+    def __init__(self, cam, exposures, settle = None, dark = None):
+        """Constructor. The first exposure time is set right away.
+
+        :param cam: Input device, see :py:class:`drivers.backends.Spectrometer`.
+        :param list exposures: Exposure times in ms.
+        :param int settle: Number of spectra discarded after a change of the exposure time. If None, use the `settle` attribute of the input device.
+        :param func dark: Function that returns the dark spectrum in counts for given exposure time and gain (exp, gain) or None.
+        """
+        self.cam = cam
+        self.exposures = list(exposures)
+        self.floor = 1.0 / max(self.exposures)
+        self.settle = cam.settle if settle is None else settle
+        self.dark = dark
+        self.gain = cam.get_gain()
+
+        self._index = 0
+        self._rates = [None] * len(self.exposures)
+        self._saturated = [None] * len(self.exposures)
+        self._out = None
+        cam.set_exposure(self.exposures[0])
+
+    def read(self):
+        """Read the spectrum for the current exposure time, switch to the next one and merge.
+
+        :returns: Merged spectrum in counts per ms and a flag indicating whether there are points that are saturated in all spectra (data, ovexp). The spectrum is a buffer that is overwritten by the next call.
+        """
+        i = self._index
+        exp = self.exposures[i]
+        data, saturated = self.cam.read_mask()
+
+        # set the next exposure time before processing this one; continuously capturing devices start exposing right away
+        self._index = (i + 1) % len(self.exposures)
+        if self._index != i:
+            self.cam.set_exposure(self.exposures[self._index])
+            for j in range(self.settle):
+                self.cam.read_mask()
+
+        rate = np.array(data, dtype=float)
+        if self.dark is not None:
+            dark = self.dark(exp, self.gain)
+            if dark is not None and len(dark) == len(rate):
+                rate -= dark
+        np.maximum(rate, 1.0, out=rate)
+        rate /= exp
+        self._rates[i] = rate
+        self._saturated[i] = saturated
+
+        # merge the latest spectrum of every exposure time read so far
+        valid = [k for k in range(len(self.exposures)) if self._rates[k] is not None and len(self._rates[k]) == len(rate)]
+        if self._out is None or len(self._out) != len(rate):
+            self._out = np.empty(len(rate))
+        merge([self._rates[k] for k in valid], [self.exposures[k] for k in valid], [self._saturated[k] for k in valid], self._out)
+
+        allsat = np.logical_and.reduce([self._saturated[k] for k in valid])
+        return self._out, bool(np.any(allsat))
+
+    def close(self):
+        """Restore the first exposure time.
+        """
+        self.cam.set_exposure(self.exposures[0])
@@ -0,0 +1,210 @@
+"""
+.. module: uvvis.multi
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Acquisition from several input devices at the same time.
+
+Each device is read by its own :py:class:`uvvis.acquisition.AcquisitionController`, i.e. in its own worker thread, so that the devices are read concurrently. The calls into the camera driver, e.g. waiting for a frame in `is_FreezeVideo`, are ctypes calls that release the GIL, so the threads really wait for their devices in parallel. The worker threads are synchronized by a barrier: a device starts reading its next spectrum only when all devices have finished the previous one, and all spectra read in the same round get the same timestamp, the time at which the round started. Recordings of the devices (see :py:class:`uvvis.recorder.SpectrumRecorder`) therefore have the same number of spectra with identical timestamps and can be put side by side.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import time
+import threading
+
+import drivers.backends as backends
+from uvvis.acquisition import AcquisitionController
+
+
+def connect_devices(name, devices = None):
+    """Connect to several devices of one type.
+
+    :param str name: Name of the backend.
+    :param list devices: Identifiers of the devices (see :py:func:`drivers.backends.Spectrometer.devices`). If None, connect to all connected devices.
+    :returns: List of connected backends.
+    """
+    cls = backends.get_backend(name)
+    if devices is None:
+        devices = cls.devices()
+    cams = []
+    try:
+        for device in devices:
+            cam = cls(device)
+            cam.connect()
+            cams.append(cam)
+    except Exception:
+        for cam in cams:
+            cam.close()
+        raise
+    return cams
+
+
+class _Barrier(object):
+    # reusable barrier that returns the time at which the last thread arrived (threading.Barrier is not available in Python 2)
+    # once broken by abort() or a timeout, wait() returns right away until reset()
+    def __init__(self, parties):
+        self.parties = parties
+        self._cond = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        with self._cond:
+            self._count = 0
+            self._round = 0
+            self._time = None
+            self.broken = False
+            self._cond.notify_all()
+
+    def abort(self):
+        with self._cond:
+            self.broken = True
+            self._cond.notify_all()
+
+    def wait(self, timeout = None):
+        with self._cond:
+            if self.broken:
+                return time.time()
+
+            rnd = self._round
+            self._count += 1
+            if self._count == self.parties:
+                self._count = 0
+                self._round += 1
+                self._time = time.time()
+                self._cond.notify_all()
+                return self._time
+
+            end = None if timeout is None else time.time() + timeout
+            while self._round == rnd and not self.broken:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    print("WARNING: Devices did not start reading within %gs, synchronization is lost.." % timeout)
+                    self.broken = True
+                    self._cond.notify_all()
+                    break
+                self._cond.wait(remaining)
+
+            if self._round != rnd:
+                return self._time
+            return time.time()
+
+
+class DeviceGroup(object):
+    """Reads several input devices concurrently with shared timestamps.
+
+    Mode, dark and reference spectra and live averaging are set per device on the controllers in :py:attr:`acqs`. The number of averages is shared, as the devices are read in lock step. Start and stop the acquisition through the group only, otherwise the other devices wait for the stopped one until `timeout`.
+    """
+    def __init__(self, cams, reads = None, callback = None, maxsize = 4, timeout = 30.0):
+        """Constructor.
+
+        :param list cams: Connected input devices (see :py:mod:`drivers.backends`).
+        :param list reads: Functions that read one spectrum from each device and return (data, ovexp). If None, the `read` method of each device is used.
+        :param func callback: Function without arguments that is called from the worker threads when new results are available.
+        :param int maxsize: Maximum number of results kept in the queue of each device.
+        :param float timeout: Time in s the devices wait for each other before synchronization is given up.
+        """
+        self.cams = list(cams)
+        self.timeout = timeout
+        self._barrier = _Barrier(len(self.cams))
+        self._timestamps = [None] * len(self.cams)
+
+        if reads is None:
+            reads = [cam.read for cam in self.cams]
+        self.acqs = []
+        for i, read in enumerate(reads):
+            acq = AcquisitionController(self._reader(i, read), callback, maxsize)
+            acq.clock = self._clock(i)
+            self.acqs.append(acq)
+
+    # read function of device i: wait until all devices are ready, then read and keep the time at which the round started
+    def _reader(self, i, read):
+        def reader():
+            t = self._barrier.wait(self.timeout)
+            try:
+                result = read()
+            except Exception:
+                self._barrier.abort()    # do not let the other devices wait for this one
+                raise
+            self._timestamps[i] = t
+            return result
+        return reader
+
+    def _clock(self, i):
+        return lambda: self._timestamps[i]
+
+    @property
+    def avg(self):
+        """Number of averages when recording.
+        """
+        return self.acqs[0].avg
+
+    @avg.setter
+    def avg(self, avg):
+        for acq in self.acqs:
+            with acq.lock:
+                acq.avg = avg
+
+    @property
+    def running(self):
+        """True while any of the devices is acquiring.
+        """
+        return any(acq.running for acq in self.acqs)
+
+    def start(self, recording = False, recorders = None):
+        """Start the acquisition on all devices.
+
+        :param bool recording: If True, average :py:attr:`avg` spectra and stop afterwards. Otherwise, run in live mode until :py:func:`stop` is called.
+        :param list recorders: :py:class:`uvvis.recorder.SpectrumRecorder` per device (or None).
+        """
+        self.stop(wait=True)
+        self._barrier.reset()
+        if recorders is None:
+            recorders = [None] * len(self.acqs)
+        for acq, recorder in zip(self.acqs, recorders):
+            acq.start(recording, recorder)
+
+    def stop(self, wait = False):
+        """Stop the acquisition on all devices.
+
+        :param bool wait: Wait until all worker threads have finished.
+        """
+        for acq in self.acqs:
+            acq.stop()
+        self._barrier.abort()
+        if wait:
+            for acq in self.acqs:
+                acq.stop(wait=True)
+
+    def wait(self, timeout = None):
+        """Wait until the acquisition has stopped on all devices.
+
+        :param float timeout: Maximum time to wait for each device in s or None to wait forever.
+        :returns: True if the acquisition has stopped.
+        """
+        return all([acq.wait(timeout) for acq in self.acqs])
+
+    def get_latest(self):
+        """Returns the newest result of each device as list, see :py:func:`uvvis.acquisition.AcquisitionController.get_latest`. Entries are None for devices without new results.
+        """
+        return [acq.get_latest() for acq in self.acqs]
+
+    def close(self):
+        """Stop the acquisition and close all devices.
+        """
+        self.stop(wait=True)
+        for cam in self.cams:
+            cam.close()
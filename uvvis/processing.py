@@ -0,0 +1,211 @@
+"""
+.. module: uvvis.processing
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Processing of raw spectra: dark subtraction, clamping, conversion to optical density and averaging.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import numpy as np
+
+
+class ProcessingKernel(object):
+    """Processes raw spectra in place using preallocated work buffers.
+
+    The OD is calculated as log10(reference) - log10(max(data - dark, floor)), where log10(reference) is cached for as long as the same reference array is passed. The floor is 1 count for spectra in counts; for spectra in counts per ms it has to be scaled accordingly, e.g. to 1 count in the longest exposure time.
+    """
+    def __init__(self):
+        self._buf = None
+        self._ref = None
+        self._logref = None
+
+    def _log_reference(self, reference):
+        if reference is not self._ref or self._logref is None or len(self._logref) != len(reference):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self._logref = np.log10(np.asarray(reference, dtype=float))
+            self._ref = reference
+        return self._logref
+
+    def process(self, data, dark = None, reference = None, floor = 1.0):
+        """Apply dark correction and, if a reference is given, conversion to OD.
+
+        :param array data: Raw spectrum.
+        :param array dark: Dark spectrum or None.
+        :param array reference: Reference spectrum for UV/VIS mode or None.
+        :param float floor: Minimum value of the dark corrected spectrum (> 0).
+        :returns: Processed spectrum. This is a work buffer that is overwritten by the next call, so it has to be copied if it is kept.
+        """
+        if self._buf is None or len(self._buf) != len(data):
+            self._buf = np.empty(len(data))
+        buf = self._buf
+
+        # dark level subtraction
+        if dark is not None:
+            np.subtract(data, dark, out=buf)
+        else:
+            np.copyto(buf, data)
+
+        # force minimum pixel value to be the floor to prevent NaNs
+        np.maximum(buf, floor, out=buf)
+
+        # OD
+        if reference is not None:
+            np.log10(buf, out=buf)
+            with np.errstate(invalid="ignore"):
+                np.subtract(self._log_reference(reference), buf, out=buf)
+            np.nan_to_num(buf, copy=False)
+        return buf
+
+
+class RunningStatistics(object):
+    """Per-pixel mean and variance of a series of spectra using Welford's algorithm.
+
+    Unlike the running average mean = (mean * n + x) / (n + 1), the update does not scale the accumulated mean by n, so it does not lose precision for large numbers of averages. All updates are done in place on preallocated buffers.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Discard all spectra. New buffers are allocated with the next spectrum, so arrays returned by :py:attr:`mean` before stay valid.
+        """
+        self.n = 0
+        self.mean = None
+        self._m2 = None
+        self._delta = None
+        self._tmp = None
+
+    def add(self, data):
+        """Add a spectrum.
+
+        :param array data: Spectrum.
+        """
+        if self.mean is None or len(self.mean) != len(data):
+            self.n = 0
+            self.mean = np.zeros(len(data))
+            self._m2 = np.zeros(len(data))
+            self._delta = np.empty(len(data))
+            self._tmp = np.empty(len(data))
+        self.n += 1
+
+        # delta = x - mean_(n-1); mean_n = mean_(n-1) + delta / n; M2_n = M2_(n-1) + delta * (x - mean_n)
+        np.subtract(data, self.mean, out=self._delta)
+        np.divide(self._delta, self.n, out=self._tmp)
+        self.mean += self._tmp
+        np.subtract(data, self.mean, out=self._tmp)
+        self._tmp *= self._delta
+        self._m2 += self._tmp
+
+    def variance(self):
+        """Returns the per-pixel sample variance or None if less than two spectra have been added.
+        """
+        if self.n < 2:
+            return None
+        return self._m2 / (self.n - 1)
+
+    def stderr(self):
+        """Returns the per-pixel standard error of the mean or None if less than two spectra have been added.
+        """
+        if self.n < 2:
+            return None
+        return np.sqrt(self._m2 / (float(self.n - 1) * self.n))
+
+
+class MovingAverage(object):
+    """Boxcar average over the last `N` spectra.
+
+    The spectra are kept in a ring buffer and the sum is updated by subtracting the oldest and adding the newest spectrum. To keep rounding errors from accumulating, the sum is recalculated from the ring buffer whenever the buffer wraps around.
+    """
+    def __init__(self, N):
+        """Constructor.
+
+        :param int N: Number of spectra to average.
+        """
+        self.N = max(1, int(N))
+        self.reset()
+
+    def reset(self):
+        """Discard all spectra.
+        """
+        self.n = 0
+        self.mean = None
+        self._ring = None
+        self._sum = None
+        self._pos = 0
+
+    def add(self, data):
+        """Add a spectrum.
+
+        :param array data: Spectrum.
+        :returns: Average of the last `N` spectra. This buffer is updated in place by the next call.
+        """
+        if self._ring is None or self._ring.shape[1] != len(data):
+            self.reset()
+            self._ring = np.empty((self.N, len(data)))
+            self._sum = np.zeros(len(data))
+            self.mean = np.empty(len(data))
+
+        slot = self._ring[self._pos]
+        if self.n == self.N:
+            self._sum -= slot
+        slot[:] = data
+        self._sum += slot
+        self._pos = (self._pos + 1) % self.N
+        self.n = min(self.n + 1, self.N)
+        if self._pos == 0:
+            np.sum(self._ring, axis=0, out=self._sum)
+
+        np.divide(self._sum, self.n, out=self.mean)
+        return self.mean
+
+
+class ExponentialAverage(object):
+    """Exponential moving average mean = mean + alpha * (x - mean) with alpha = 2 / (N + 1), i.e. the same center of mass as a boxcar over `N` spectra.
+    """
+    def __init__(self, N):
+        """Constructor.
+
+        :param int N: Equivalent number of spectra.
+        """
+        self.N = max(1, int(N))
+        self.alpha = 2.0 / (self.N + 1)
+        self.reset()
+
+    def reset(self):
+        """Discard all spectra.
+        """
+        self.n = 0
+        self.mean = None
+        self._tmp = None
+
+    def add(self, data):
+        """Add a spectrum.
+
+        :param array data: Spectrum.
+        :returns: Current average. This buffer is updated in place by the next call.
+        """
+        if self.mean is None or len(self.mean) != len(data):
+            self.mean = np.array(data, dtype=float)
+            self._tmp = np.empty(len(data))
+            self.n = 1
+            return self.mean
+
+        np.subtract(data, self.mean, out=self._tmp)
+        self._tmp *= self.alpha
+        self.mean += self._tmp
+        self.n += 1
+        return self.mean
@@ -0,0 +1,153 @@
+"""
+.. module: uvvis.recorder
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Streaming of time series of spectra to disk.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import threading
+import time
+import numpy as np
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from uvvis import fileio
+
+# space reserved for the header, so that it can be updated while the file grows
+HEADER_SIZE = 4096
+
+
+class SpectrumRecorder(object):
+    """Appends spectra with timestamps to a binary spectrum file (see :py:mod:`uvvis.fileio`) in a background thread.
+
+    :py:func:`append` only copies the spectrum into a bounded queue, the writer thread takes the spectra from the queue in chunks, writes them and updates the number of spectra in the header, so that the file is always readable, even while recording. Memory use is limited to `maxqueue` spectra. If the disk cannot keep up and the queue stays full for longer than `timeout`, spectra are dropped and counted in :py:attr:`dropped`. If writing fails, e.g. because the disk is full, the writer thread stops and the exception is stored in :py:attr:`error` and raised by the next call to :py:func:`append` or :py:func:`close`.
+    """
+    def __init__(self, filename, wl, dtype = np.float32, maxqueue = 1024, chunk = 64, timeout = 1.0, **meta):
+        """Constructor. Creates the file and starts the writer thread.
+
+        :param str filename: Name of the file.
+        :param array wl: Wavelength axis.
+        :param dtype: Data type used for storing the spectra (float32 or float64).
+        :param int maxqueue: Maximum number of spectra waiting to be written.
+        :param int chunk: Maximum number of spectra written at once.
+        :param float timeout: Maximum time in s that :py:func:`append` waits if the queue is full.
+        :param mixed meta: Acquisition settings stored in the header (see :py:func:`uvvis.fileio.save_binary`).
+        """
+        self.filename = filename
+        self.wl = np.ascontiguousarray(wl, dtype="<f8")
+        self.dtype = fileio.record_dtype(dtype, len(self.wl))
+        self.chunk = chunk
+        self.timeout = timeout
+        self.count = 0
+        self.dropped = 0
+        self.error = None
+
+        self.meta = dict(meta)
+        self.meta.update({"dtype": self.dtype["data"].base.str, "timestamps": True})
+
+        self._queue = queue.Queue(maxqueue)
+        self._file = open(filename, "wb")
+        self._write_header()
+        self._file.write(self.wl.tobytes())
+        self._file.flush()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def append(self, data, timestamp = None):
+        """Add a spectrum to the recording.
+
+        :param array data: Spectrum.
+        :param float timestamp: Time of acquisition (seconds since the epoch). If None, the current time is used.
+        :returns: False if the spectrum had to be dropped.
+        :raises: the exception that stopped the writer thread.
+        """
+        if self.error is not None:
+            raise self.error
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self._queue.put((timestamp, np.array(data, dtype=float)), timeout=self.timeout)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self):
+        """Write all pending spectra, finalize the header and close the file.
+
+        :raises: the exception that stopped the writer thread.
+        """
+        if self._thread is None:
+            return
+        # the queue may stay full if the writer thread has stopped
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        if self.dropped > 0:
+            print("WARNING: %d spectra could not be written to %s.." % (self.dropped, self.filename))
+        if self.error is not None:
+            raise self.error
+
+    def _write_header(self):
+        self.meta["shape"] = [self.count, len(self.wl)]
+        pos = self._file.tell()
+        fileio.write_header(self._file, self.meta, HEADER_SIZE)
+        if pos > HEADER_SIZE:
+            self._file.seek(pos)
+
+    # writer thread
+    def _run(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            self.error = e
+
+    def _write_loop(self):
+        buf = np.empty(self.chunk, dtype=self.dtype)
+        done = False
+        while not done:
+            # wait for the next spectrum, then take whatever else is waiting up to the chunk size
+            items = [self._queue.get()]
+            while len(items) < self.chunk:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                items.pop()
+                done = True
+
+            for i, (t, data) in enumerate(items):
+                buf["t"][i] = t
+                buf["data"][i] = data
+            self._file.write(buf[:len(items)].tobytes())
+            self.count += len(items)
+            self._write_header()
+            self._file.flush()
@@ -0,0 +1,167 @@
+"""
+.. module: uvvis.timing
+   :platform: Windows, Linux, OSX
+.. moduleauthor:: Daniel Dietze <daniel.dietze@berkeley.edu>
+
+Timing instrumentation of the measurement loop.
+
+Every stage of the loop (camera wait, data reduction, processing, drawing, ..) records its start time and duration from a monotonic clock into a rolling window. From these, per-stage statistics and histograms as well as the achieved frame rate are calculated. The recorded events can be exported in the Chrome trace event format, which can be loaded in *chrome://tracing* or https://ui.perfetto.dev.
+
+..
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU General Public License as published by
+   the Free Software Foundation, either version 3 of the License, or
+   (at your option) any later version.
+
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU General Public License for more details.
+
+   You should have received a copy of the GNU General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+   Copyright 2016 Daniel Dietze <daniel.dietze@berkeley.edu>.
+"""
+import os
+import json
+import time
+import threading
+import collections
+import numpy as np
+
+clock = getattr(time, "perf_counter", time.time)
+
+
+class _Stage(object):
+    # context manager returned by StageTimer.measure
+    __slots__ = ("timer", "name", "t0")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = clock()
+        return self
+
+    def __exit__(self, *args):
+        self.timer.record(self.name, self.t0, clock())
+
+
+class StageTimer(object):
+    """Records the duration of the stages of the measurement loop in rolling windows.
+
+    Stages are timed with::
+
+        with timer.measure("process"):
+            ...
+
+    or, where a context manager does not fit, with `t0 = timer.now()` and `timer.record("wait", t0, timer.now())`. :py:func:`frame` marks the completion of a frame for the frame rate. Appending to the windows is thread-safe, so stages can be recorded from several threads.
+    """
+    def __init__(self, maxlen = 1000):
+        """Constructor.
+
+        :param int maxlen: Number of events kept per stage (and of frame marks).
+        """
+        self.maxlen = maxlen
+        self.t0 = clock()
+        self._stages = collections.OrderedDict()
+        self._frames = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        """Returns the current time of the monotonic clock in s.
+        """
+        return clock()
+
+    def measure(self, name):
+        """Returns a context manager that records the time spent in the `with` block as stage `name`.
+        """
+        return _Stage(self, name)
+
+    def record(self, name, t0, t1):
+        """Record a stage.
+
+        :param str name: Name of the stage.
+        :param float t0: Start time (see :py:func:`now`).
+        :param float t1: End time.
+        """
+        events = self._stages.get(name)
+        if events is None:
+            with self._lock:
+                events = self._stages.setdefault(name, collections.deque(maxlen=self.maxlen))
+        events.append((t0, t1 - t0, threading.current_thread().ident))
+
+    def frame(self):
+        """Mark the completion of a frame.
+        """
+        self._frames.append(clock())
+
+    def reset(self):
+        """Discard all recorded events.
+        """
+        with self._lock:
+            self._stages.clear()
+            self._frames.clear()
+
+    def stages(self):
+        """Returns the names of all recorded stages in the order they were first recorded.
+        """
+        return list(self._stages)
+
+    def durations(self, name):
+        """Returns the durations of the recorded events of a stage in ms.
+        """
+        events = list(self._stages.get(name, ()))
+        return np.array([e[1] for e in events]) * 1000.0
+
+    def stats(self, name):
+        """Returns statistics of the durations of a stage in ms as dictionary (count, mean, p50, p95, max) or None if there are no events.
+        """
+        ms = self.durations(name)
+        if len(ms) == 0:
+            return None
+        return {"count": len(ms), "mean": float(np.mean(ms)), "p50": float(np.percentile(ms, 50)),
+                "p95": float(np.percentile(ms, 95)), "max": float(np.amax(ms))}
+
+    def histogram(self, name, bins = 20):
+        """Returns the histogram of the durations of a stage in ms as returned by :py:func:`numpy.histogram` (counts, bin edges).
+        """
+        return np.histogram(self.durations(name), bins=bins)
+
+    def fps(self):
+        """Returns the frame rate over the frames in the rolling window or 0 if there are less than two frames.
+        """
+        frames = list(self._frames)
+        if len(frames) < 2 or frames[-1] == frames[0]:
+            return 0.0
+        return (len(frames) - 1) / (frames[-1] - frames[0])
+
+    def summary(self):
+        """Returns a one line summary of the frame rate and the mean duration of every stage, e.g. for a status bar.
+        """
+        text = ["%.1f fps" % self.fps()]
+        for name in self.stages():
+            stats = self.stats(name)
+            if stats is not None:
+                text.append("%s %.2f ms" % (name, stats["mean"]))
+        return " | ".join(text)
+
+    def export_trace(self, filename):
+        """Write the recorded events to a file in the Chrome trace event format (JSON).
+
+        :param str filename: Name of the file.
+        """
+        events = []
+        pid = os.getpid()
+        for name in self.stages():
+            for t0, dt, tid in list(self._stages[name]):
+                events.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                               "ts": (t0 - self.t0) * 1e6, "dur": dt * 1e6})
+        for t in list(self._frames):
+            events.append({"name": "frame", "ph": "i", "s": "p", "pid": pid, "tid": 0, "ts": (t - self.t0) * 1e6})
+        events.sort(key=lambda e: e["ts"])
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)